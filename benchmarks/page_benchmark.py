@@ -0,0 +1,205 @@
+"""
+Page Benchmark - Cold and warm render cost of each dashboard page
+
+Drives every page headlessly with Streamlit's AppTest against the local DuckDB
+warehouse (see streamlit_app/utils/local_warehouse.py), so runs are
+deterministic and need no Snowflake account. For each page and date preset it
+reports cold latency (result caches cleared), warm latency (immediate rerun),
+warehouse queries issued, rows transferred and peak Python heap. The heap is
+measured with tracemalloc, so Arrow and DuckDB buffers are not included.
+
+Queries from background prefetches (e.g. Customer Insights' next page) are
+waited for and counted with the cold run; the warm run starts after them.
+
+Usage:
+    python benchmarks/page_benchmark.py
+    python benchmarks/page_benchmark.py --orders 5000000 --output results.json
+    python benchmarks/page_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/page_benchmark.py --baseline benchmarks/baseline.json
+
+The report goes to stdout and Streamlit's own log output to stderr. With
+--baseline the script exits non-zero when a page is slower or heavier
+than the baseline by more than --tolerance, or issues more queries.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "streamlit_app")
+sys.path.insert(0, APP_DIR)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from utils.batch_loader import wait_for_prefetches  # noqa: E402
+from utils.freshness import recheck  # noqa: E402
+from utils.local_warehouse import LocalConnection  # noqa: E402
+from utils.range_cache import get_range_cache  # noqa: E402
+
+PAGES = {
+    "executive_dashboard": "app_pages/executive_dashboard.py",
+    "regional_analysis": "app_pages/regional_analysis.py",
+    "product_analysis": "app_pages/product_analysis.py",
+    "sales_rep_leaderboard": "app_pages/sales_rep_leaderboard.py",
+    "customer_insights": "app_pages/customer_insights.py",
+}
+
+PRESETS = {"30D": 30, "90D": 90, "1Y": 365}
+
+# Fixed so every run sees the same data and date windows
+END_DATE = date(2025, 12, 31)
+
+# Metrics compared against the baseline as ratios; queries must not increase
+RATIO_METRICS = ("cold_ms", "warm_ms", "cold_peak_mb")
+
+RUN_TIMEOUT = 120
+
+
+class CountingConnection:
+    """Wrap a connection and count the queries and rows it serves."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.rows = 0
+
+    def _record(self, rows):
+        with self._lock:
+            self.queries += 1
+            self.rows += rows
+
+    def query(self, sql, **kwargs):
+        frame = self._conn.query(sql, **kwargs)
+        self._record(len(frame))
+        return frame
+
+    def cursor(self):
+        # Cursor results are paged, so only statements are counted
+        self._record(0)
+        return self._conn.cursor()
+
+
+def _run(app):
+    """Run the app once; return (elapsed ms, peak Python heap MB)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    app.run(timeout=RUN_TIMEOUT)
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed, peak / (1024 * 1024)
+
+
+def measure(conn, page_path, days):
+    """Cold and warm metrics for one page at one date preset."""
+    start_date = END_DATE - timedelta(days=days)
+    app = AppTest.from_file(os.path.join(APP_DIR, "streamlit_app.py"), default_timeout=RUN_TIMEOUT)
+    app.session_state["conn"] = conn
+    for key, value in (("date_start", start_date), ("date_end", END_DATE),
+                       ("filter_date_start", start_date), ("filter_date_end", END_DATE)):
+        app.session_state[key] = value
+    app.switch_page(page_path)
+
+    get_range_cache().clear()
+    recheck()
+    conn.reset()
+    cold_ms, cold_peak = _run(app)
+    wait_for_prefetches(RUN_TIMEOUT)
+    cold_queries, cold_rows = conn.queries, conn.rows
+
+    conn.reset()
+    warm_ms, warm_peak = _run(app)
+    wait_for_prefetches(RUN_TIMEOUT)
+    return {
+        "cold_ms": round(cold_ms, 1),
+        "warm_ms": round(warm_ms, 1),
+        "cold_queries": cold_queries,
+        "warm_queries": conn.queries,
+        "cold_rows": cold_rows,
+        "warm_rows": conn.rows,
+        "cold_peak_mb": round(cold_peak, 2),
+        "warm_peak_mb": round(warm_peak, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in RATIO_METRICS:
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{key} {metric}: {current[metric]} vs baseline {previous[metric]}")
+        for metric in ("cold_queries", "warm_queries"):
+            if current[metric] > previous[metric]:
+                regressions.append(f"{key} {metric}: {current[metric]} vs baseline {previous[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--orders", type=int, default=1_000_000, help="orders in the local dataset")
+    parser.add_argument("--pages", nargs="*", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--presets", nargs="*", choices=list(PRESETS), default=list(PRESETS))
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio")
+    args = parser.parse_args(argv)
+
+    # Keep the result caches in process memory regardless of the environment
+    os.environ.pop("SALES_CACHE_DIR", None)
+
+    print(f"Seeding local warehouse with {args.orders:,} orders...", file=sys.stderr)
+    conn = CountingConnection(LocalConnection(orders=args.orders, end_date=END_DATE))
+
+    # One untimed render pays for imports and chart library start-up
+    measure(conn, PAGES[args.pages[0]], PRESETS[args.presets[0]])
+
+    results = {}
+    header = f"{'page':<24}{'preset':<8}{'cold ms':>10}{'warm ms':>10}{'queries':>10}{'rows':>10}{'heap MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for page in args.pages:
+        for preset in args.presets:
+            metrics = measure(conn, PAGES[page], PRESETS[preset])
+            results[f"{page}/{preset}"] = metrics
+            print(
+                f"{page:<24}{preset:<8}{metrics['cold_ms']:>10.1f}{metrics['warm_ms']:>10.1f}"
+                f"{metrics['cold_queries']:>10}{metrics['cold_rows']:>10}{metrics['cold_peak_mb']:>10.2f}"
+            )
+
+    payload = {"orders": args.orders, "end_date": str(END_DATE), "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as output:
+                json.dump(payload, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("orders") != args.orders:
+            print(f"Warning: baseline was recorded with {baseline.get('orders'):,} orders", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("\nRegressions:", *regressions, sep="\n  ")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
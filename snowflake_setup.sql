@@ -209,14 +209,27 @@ SELECT
     END AS IS_VALID
 FROM RAW.ORDERS;
 
+-- Incremental refresh reads the change streams of the base tables behind the
+-- staging views
+ALTER TABLE RAW.CUSTOMERS SET CHANGE_TRACKING = TRUE;
+ALTER TABLE RAW.PRODUCTS SET CHANGE_TRACKING = TRUE;
+ALTER TABLE RAW.SALES_REPS SET CHANGE_TRACKING = TRUE;
+ALTER TABLE RAW.ORDERS SET CHANGE_TRACKING = TRUE;
+
 -- ============================================================================
 -- PHASE 4: MARTS - FACT TABLE (Dynamic Table)
 -- ============================================================================
 
--- FCT_ORDERS: Main fact table joining all dimensions
+-- FCT_ORDERS: Main fact table joining all dimensions. Refreshed only when the
+-- marts below need it (DOWNSTREAM), so each 5 minute cycle processes it once.
+-- Every page query filters on ORDER_DATE BETWEEN ..., so the table is
+-- clustered on ORDER_DATE to let date ranges prune micro-partitions. New
+-- orders arrive in date order, which keeps automatic reclustering cheap.
 CREATE OR REPLACE DYNAMIC TABLE MARTS.FCT_ORDERS
-    TARGET_LAG = '5 minutes'
+    TARGET_LAG = DOWNSTREAM
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (ORDER_DATE)
 AS
 SELECT 
     -- Order keys
@@ -266,43 +279,79 @@ WHERE o.IS_VALID = TRUE;
 -- ============================================================================
 -- PHASE 5: MARTS - AGGREGATION DYNAMIC TABLES
 -- ============================================================================
+-- These marts refresh incrementally, so they only use aggregates Snowflake can
+-- maintain from changed rows: SUM, COUNT, MIN and MAX. Averages are derived by
+-- the app as SUM / COUNT (REVENUE / ORDER_COUNT). Exact distinct customer
+-- counts come from an inner aggregate per customer, counted by the outer one.
+--
+-- HyperLogLog sketches for approximate distinct counts live in separate
+-- *_CUSTOMER_SKETCH marts (below), so a refresh mode Snowflake refuses for
+-- HLL_ACCUMULATE cannot break these.
+--
+-- The date-grained rollups are clustered on their date column like
+-- FCT_ORDERS; the router filters them with ORDER_DATE / ORDER_MONTH / MONTH
+-- BETWEEN ... (see the Pruning Diagnostics page).
 
 -- DAILY_SALES: Daily aggregation
 CREATE OR REPLACE DYNAMIC TABLE MARTS.DAILY_SALES
     TARGET_LAG = '5 minutes'
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (ORDER_DATE)
 AS
 SELECT 
     ORDER_DATE,
-    SUM(NET_AMOUNT) AS REVENUE,
-    SUM(GROSS_AMOUNT) AS GROSS_REVENUE,
-    SUM(DISCOUNT_AMOUNT) AS DISCOUNT_TOTAL,
-    COUNT(*) AS ORDER_COUNT,
-    COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT,
-    SUM(QUANTITY) AS UNITS_SOLD,
-    AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
-FROM MARTS.FCT_ORDERS
+    SUM(REVENUE) AS REVENUE,
+    SUM(GROSS_REVENUE) AS GROSS_REVENUE,
+    SUM(DISCOUNT_TOTAL) AS DISCOUNT_TOTAL,
+    SUM(ORDER_COUNT) AS ORDER_COUNT,
+    COUNT(*) AS CUSTOMER_COUNT,
+    SUM(UNITS_SOLD) AS UNITS_SOLD
+FROM (
+    SELECT 
+        ORDER_DATE,
+        CUSTOMER_ID,
+        SUM(NET_AMOUNT) AS REVENUE,
+        SUM(GROSS_AMOUNT) AS GROSS_REVENUE,
+        SUM(DISCOUNT_AMOUNT) AS DISCOUNT_TOTAL,
+        COUNT(*) AS ORDER_COUNT,
+        SUM(QUANTITY) AS UNITS_SOLD
+    FROM MARTS.FCT_ORDERS
+    GROUP BY ORDER_DATE, CUSTOMER_ID
+)
 GROUP BY ORDER_DATE;
 
 -- SALES_BY_REGION: Regional aggregation by month
 CREATE OR REPLACE DYNAMIC TABLE MARTS.SALES_BY_REGION
     TARGET_LAG = '5 minutes'
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (ORDER_MONTH)
 AS
 SELECT 
     ORDER_REGION AS REGION,
     ORDER_MONTH,
-    SUM(NET_AMOUNT) AS REVENUE,
-    COUNT(*) AS ORDER_COUNT,
-    COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT,
-    AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
-FROM MARTS.FCT_ORDERS
+    SUM(REVENUE) AS REVENUE,
+    SUM(ORDER_COUNT) AS ORDER_COUNT,
+    COUNT(*) AS CUSTOMER_COUNT
+FROM (
+    SELECT 
+        ORDER_REGION,
+        ORDER_MONTH,
+        CUSTOMER_ID,
+        SUM(NET_AMOUNT) AS REVENUE,
+        COUNT(*) AS ORDER_COUNT
+    FROM MARTS.FCT_ORDERS
+    GROUP BY ORDER_REGION, ORDER_MONTH, CUSTOMER_ID
+)
 GROUP BY ORDER_REGION, ORDER_MONTH;
 
 -- SALES_BY_PRODUCT: Product aggregation by month
 CREATE OR REPLACE DYNAMIC TABLE MARTS.SALES_BY_PRODUCT
     TARGET_LAG = '5 minutes'
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (MONTH)
 AS
 SELECT 
     PRODUCT_ID,
@@ -312,8 +361,7 @@ SELECT
     ORDER_MONTH AS MONTH,
     SUM(NET_AMOUNT) AS REVENUE,
     COUNT(*) AS ORDER_COUNT,
-    SUM(QUANTITY) AS UNITS_SOLD,
-    AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
+    SUM(QUANTITY) AS UNITS_SOLD
 FROM MARTS.FCT_ORDERS
 GROUP BY PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY, ORDER_MONTH;
 
@@ -321,6 +369,7 @@ GROUP BY PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY, ORDER_MONTH;
 CREATE OR REPLACE DYNAMIC TABLE MARTS.SALES_BY_CUSTOMER
     TARGET_LAG = '5 minutes'
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
 AS
 SELECT 
     CUSTOMER_ID,
@@ -329,16 +378,38 @@ SELECT
     INDUSTRY,
     SUM(NET_AMOUNT) AS TOTAL_REVENUE,
     COUNT(*) AS ORDER_COUNT,
-    AVG(NET_AMOUNT) AS AVG_ORDER_VALUE,
     MIN(ORDER_DATE) AS FIRST_ORDER_DATE,
     MAX(ORDER_DATE) AS LAST_ORDER_DATE
 FROM MARTS.FCT_ORDERS
 GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY;
 
+-- SALES_BY_CUSTOMER_MONTH: Customer aggregation by month, so a dated
+-- customer ranking reads whole months here instead of FCT_ORDERS
+CREATE OR REPLACE DYNAMIC TABLE MARTS.SALES_BY_CUSTOMER_MONTH
+    TARGET_LAG = '5 minutes'
+    WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (MONTH)
+AS
+SELECT
+    CUSTOMER_ID,
+    CUSTOMER_NAME,
+    CUSTOMER_SEGMENT,
+    INDUSTRY,
+    ORDER_MONTH AS MONTH,
+    SUM(NET_AMOUNT) AS REVENUE,
+    COUNT(*) AS ORDER_COUNT,
+    MIN(ORDER_DATE) AS FIRST_ORDER_DATE,
+    MAX(ORDER_DATE) AS LAST_ORDER_DATE
+FROM MARTS.FCT_ORDERS
+GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY, ORDER_MONTH;
+
 -- SALES_BY_REP: Sales rep aggregation by month
 CREATE OR REPLACE DYNAMIC TABLE MARTS.SALES_BY_REP
     TARGET_LAG = '5 minutes'
     WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = INCREMENTAL
+    CLUSTER BY (MONTH)
 AS
 SELECT 
     SALES_REP_ID,
@@ -346,13 +417,107 @@ SELECT
     TEAM,
     REP_REGION AS REGION,
     ORDER_MONTH AS MONTH,
-    SUM(NET_AMOUNT) AS REVENUE,
-    COUNT(*) AS ORDER_COUNT,
-    COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT,
-    AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
-FROM MARTS.FCT_ORDERS
+    SUM(REVENUE) AS REVENUE,
+    SUM(ORDER_COUNT) AS ORDER_COUNT,
+    COUNT(*) AS CUSTOMER_COUNT
+FROM (
+    SELECT 
+        SALES_REP_ID,
+        REP_NAME,
+        TEAM,
+        REP_REGION,
+        ORDER_MONTH,
+        CUSTOMER_ID,
+        SUM(NET_AMOUNT) AS REVENUE,
+        COUNT(*) AS ORDER_COUNT
+    FROM MARTS.FCT_ORDERS
+    GROUP BY SALES_REP_ID, REP_NAME, TEAM, REP_REGION, ORDER_MONTH, CUSTOMER_ID
+)
 GROUP BY SALES_REP_ID, REP_NAME, TEAM, REP_REGION, ORDER_MONTH;
 
+-- *_CUSTOMER_SKETCH: HyperLogLog state of the customers at the grain of
+-- DAILY_SALES, SALES_BY_REGION and SALES_BY_REP. With
+-- SALES_DISTINCT_MODE=approximate the app joins them to those marts and
+-- HLL_ESTIMATE(HLL_COMBINE(CUSTOMER_HLL)) gives approximate unique customers
+-- over any set of rows, e.g. a multi-month range, where CUSTOMER_COUNT cannot
+-- be summed. REFRESH_MODE = AUTO lets Snowflake fall back to full refreshes
+-- if it cannot maintain HLL_ACCUMULATE incrementally; the Refresh Monitor
+-- page flags that fallback. The app reads them only in approximate mode, so
+-- they can be dropped when it is not used.
+CREATE OR REPLACE DYNAMIC TABLE MARTS.DAILY_CUSTOMER_SKETCH
+    TARGET_LAG = '5 minutes'
+    WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = AUTO
+    CLUSTER BY (ORDER_DATE)
+AS
+SELECT
+    ORDER_DATE,
+    HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+FROM MARTS.FCT_ORDERS
+GROUP BY ORDER_DATE;
+
+CREATE OR REPLACE DYNAMIC TABLE MARTS.REGION_CUSTOMER_SKETCH
+    TARGET_LAG = '5 minutes'
+    WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = AUTO
+    CLUSTER BY (ORDER_MONTH)
+AS
+SELECT
+    ORDER_REGION AS REGION,
+    ORDER_MONTH,
+    HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+FROM MARTS.FCT_ORDERS
+GROUP BY ORDER_REGION, ORDER_MONTH;
+
+CREATE OR REPLACE DYNAMIC TABLE MARTS.REP_CUSTOMER_SKETCH
+    TARGET_LAG = '5 minutes'
+    WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = AUTO
+    CLUSTER BY (MONTH)
+AS
+SELECT
+    SALES_REP_ID,
+    ORDER_MONTH AS MONTH,
+    HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+FROM MARTS.FCT_ORDERS
+GROUP BY SALES_REP_ID, ORDER_MONTH;
+
+-- KPI_SNAPSHOT: Executive KPIs for the sidebar date presets (one row each),
+-- with exact distinct customer counts. Preset dates are relative to
+-- CURRENT_DATE(), which requires full refresh; the app only uses a row whose
+-- dates match the selected range. Each full refresh rescans up to a year of
+-- FCT_ORDERS per preset, so it refreshes hourly rather than with the 5 minute
+-- marts: preset KPIs may trail them by up to an hour, and in the first hour
+-- after midnight the dates no longer match and the app queries the rollups.
+CREATE OR REPLACE DYNAMIC TABLE MARTS.KPI_SNAPSHOT
+    TARGET_LAG = '1 hour'
+    WAREHOUSE = SALES_ANALYTICS_WH
+    REFRESH_MODE = FULL
+AS
+WITH PRESETS AS (
+    SELECT '30D' AS PRESET, CURRENT_DATE() - 30 AS START_DATE, CURRENT_DATE() AS END_DATE
+    UNION ALL SELECT '90D', CURRENT_DATE() - 90, CURRENT_DATE()
+    UNION ALL SELECT '1Y', CURRENT_DATE() - 365, CURRENT_DATE()
+    UNION ALL SELECT 'MTD', DATE_TRUNC('month', CURRENT_DATE()), CURRENT_DATE()
+    UNION ALL SELECT 'QTD', DATE_TRUNC('quarter', CURRENT_DATE()), CURRENT_DATE()
+    UNION ALL SELECT 'YTD', DATE_TRUNC('year', CURRENT_DATE()), CURRENT_DATE()
+)
+SELECT 
+    p.PRESET,
+    p.START_DATE,
+    p.END_DATE,
+    COALESCE(SUM(f.NET_AMOUNT), 0) AS TOTAL_REVENUE,
+    COALESCE(SUM(f.GROSS_AMOUNT), 0) AS GROSS_REVENUE,
+    COALESCE(SUM(f.DISCOUNT_AMOUNT), 0) AS TOTAL_DISCOUNTS,
+    COUNT(f.ORDER_ID) AS ORDER_COUNT,
+    COUNT(DISTINCT f.CUSTOMER_ID) AS CUSTOMER_COUNT,
+    COALESCE(SUM(f.QUANTITY), 0) AS UNITS_SOLD,
+    AVG(f.NET_AMOUNT) AS AVG_ORDER_VALUE
+FROM PRESETS p
+LEFT JOIN MARTS.FCT_ORDERS f
+    ON f.ORDER_DATE BETWEEN p.START_DATE AND p.END_DATE
+GROUP BY p.PRESET, p.START_DATE, p.END_DATE;
+
 -- ============================================================================
 -- PHASE 6: SEMANTIC MODEL STAGE
 -- ============================================================================
@@ -365,6 +530,65 @@ CREATE OR REPLACE STAGE SEMANTIC.SEMANTIC_MODELS
 -- Note: Upload sales_model.yaml to this stage using:
 -- PUT file://path/to/sales_model.yaml @SEMANTIC.SEMANTIC_MODELS AUTO_COMPRESS=FALSE;
 
+-- ============================================================================
+-- PHASE 7: CORTEX ANSWER PROCEDURE
+-- ============================================================================
+
+-- ANSWER_QUESTION: Generate SQL with Cortex, run it and return the rows in one
+-- call. The generated SQL is returned in a leading GENERATED_SQL column; when
+-- the query returns no rows a single row with only GENERATED_SQL is returned.
+-- Read queries are capped at MAX_ROWS rows: a LIMIT is appended, or a
+-- trailing LIMIT or FETCH above MAX_ROWS is lowered to it.
+CREATE OR REPLACE PROCEDURE SEMANTIC.ANSWER_QUESTION(PROMPT VARCHAR, MAX_ROWS NUMBER)
+RETURNS TABLE()
+LANGUAGE SQL
+EXECUTE AS CALLER
+AS
+$$
+DECLARE
+    generated_sql VARCHAR;
+    trailing_rows NUMBER;
+    query_id VARCHAR;
+    row_count INTEGER;
+    res RESULTSET;
+BEGIN
+    SELECT RTRIM(TRIM(REPLACE(REPLACE(
+               SNOWFLAKE.CORTEX.COMPLETE('mistral-large2', :PROMPT),
+               '```sql', ''), '```', '')), ';')
+      INTO :generated_sql;
+
+    IF (REGEXP_LIKE(generated_sql, '[\\s(]*(SELECT|WITH)\\b.*', 'is')) THEN
+        -- Lower a trailing LIMIT or FETCH to at most MAX_ROWS, keeping any OFFSET
+        IF (REGEXP_LIKE(generated_sql, '.*\\bLIMIT\\s+\\d+(\\s+OFFSET\\s+\\d+(\\s+ROWS?)?)?\\s*$', 'is')) THEN
+            trailing_rows := REGEXP_SUBSTR(generated_sql, '\\bLIMIT\\s+(\\d+)(\\s+OFFSET\\s+\\d+(\\s+ROWS?)?)?\\s*$', 1, 1, 'ie', 1)::NUMBER;
+            generated_sql := REGEXP_REPLACE(generated_sql, '\\bLIMIT\\s+\\d+(\\s+OFFSET\\s+\\d+(\\s+ROWS?)?)?\\s*$',
+                'LIMIT ' || LEAST(trailing_rows, MAX_ROWS) || '\\1', 1, 1, 'i');
+        ELSEIF (REGEXP_LIKE(generated_sql, '.*\\bFETCH\\s+((FIRST|NEXT)\\s+)?\\d+(\\s+ROWS?)?(\\s+ONLY)?\\s*$', 'is')) THEN
+            trailing_rows := REGEXP_SUBSTR(generated_sql, '\\bFETCH\\s+((FIRST|NEXT)\\s+)?(\\d+)(\\s+ROWS?)?(\\s+ONLY)?\\s*$', 1, 1, 'ie', 3)::NUMBER;
+            generated_sql := REGEXP_REPLACE(generated_sql, '\\bFETCH\\s+((FIRST|NEXT)\\s+)?\\d+(\\s+ROWS?)?(\\s+ONLY)?\\s*$',
+                'FETCH FIRST ' || LEAST(trailing_rows, MAX_ROWS) || ' ROWS ONLY', 1, 1, 'i');
+        ELSEIF (REGEXP_LIKE(generated_sql, '.*\\bOFFSET\\s+\\d+(\\s+ROWS?)?\\s*$', 'is')) THEN
+            -- OFFSET without a row count reads every remaining row
+            generated_sql := REGEXP_REPLACE(generated_sql, '\\bOFFSET\\s+(\\d+)(\\s+ROWS?)?\\s*$',
+                'LIMIT ' || MAX_ROWS || ' OFFSET \\1', 1, 1, 'i');
+        ELSE
+            generated_sql := generated_sql || '\nLIMIT ' || MAX_ROWS;
+        END IF;
+    END IF;
+
+    EXECUTE IMMEDIATE :generated_sql;
+    query_id := SQLID;
+
+    SELECT COUNT(*) INTO :row_count FROM TABLE(RESULT_SCAN(:query_id));
+    IF (row_count = 0) THEN
+        res := (SELECT :generated_sql AS GENERATED_SQL);
+    ELSE
+        res := (SELECT :generated_sql AS GENERATED_SQL, * FROM TABLE(RESULT_SCAN(:query_id)));
+    END IF;
+    RETURN TABLE(res);
+END;
+$$;
+
 -- ============================================================================
 -- VALIDATION QUERIES
 -- ============================================================================
@@ -379,11 +603,32 @@ UNION ALL SELECT 'MARTS.DAILY_SALES', COUNT(*) FROM MARTS.DAILY_SALES
 UNION ALL SELECT 'MARTS.SALES_BY_REGION', COUNT(*) FROM MARTS.SALES_BY_REGION
 UNION ALL SELECT 'MARTS.SALES_BY_PRODUCT', COUNT(*) FROM MARTS.SALES_BY_PRODUCT
 UNION ALL SELECT 'MARTS.SALES_BY_CUSTOMER', COUNT(*) FROM MARTS.SALES_BY_CUSTOMER
-UNION ALL SELECT 'MARTS.SALES_BY_REP', COUNT(*) FROM MARTS.SALES_BY_REP;
-
--- Check Dynamic Table status
+UNION ALL SELECT 'MARTS.SALES_BY_CUSTOMER_MONTH', COUNT(*) FROM MARTS.SALES_BY_CUSTOMER_MONTH
+UNION ALL SELECT 'MARTS.SALES_BY_REP', COUNT(*) FROM MARTS.SALES_BY_REP
+UNION ALL SELECT 'MARTS.DAILY_CUSTOMER_SKETCH', COUNT(*) FROM MARTS.DAILY_CUSTOMER_SKETCH
+UNION ALL SELECT 'MARTS.REGION_CUSTOMER_SKETCH', COUNT(*) FROM MARTS.REGION_CUSTOMER_SKETCH
+UNION ALL SELECT 'MARTS.REP_CUSTOMER_SKETCH', COUNT(*) FROM MARTS.REP_CUSTOMER_SKETCH
+UNION ALL SELECT 'MARTS.KPI_SNAPSHOT', COUNT(*) FROM MARTS.KPI_SNAPSHOT;
+
+-- Check Dynamic Table status (refresh_mode should be INCREMENTAL, except
+-- KPI_SNAPSHOT; refresh_mode_reason explains a *_CUSTOMER_SKETCH on FULL)
 SHOW DYNAMIC TABLES IN SCHEMA MARTS;
 
+-- Check how recent refreshes actually ran (see the Refresh Monitor page)
+SELECT 
+    NAME,
+    REFRESH_ACTION,
+    COUNT(*) AS REFRESHES,
+    AVG(DATEDIFF('millisecond', REFRESH_START_TIME, REFRESH_END_TIME)) AS AVG_DURATION_MS
+FROM TABLE(INFORMATION_SCHEMA.DYNAMIC_TABLE_REFRESH_HISTORY(NAME_PREFIX => 'SALES_ANALYTICS_DB.MARTS.'))
+WHERE STATE = 'SUCCEEDED'
+GROUP BY NAME, REFRESH_ACTION
+ORDER BY NAME, REFRESH_ACTION;
+
+-- Check clustering of the fact table on ORDER_DATE (average_depth close to 1
+-- means date ranges prune well)
+SELECT SYSTEM$CLUSTERING_INFORMATION('MARTS.FCT_ORDERS', '(ORDER_DATE)');
+
 -- Verify total revenue (should be ~$394M)
 SELECT 
     SUM(NET_AMOUNT) as TOTAL_REVENUE,
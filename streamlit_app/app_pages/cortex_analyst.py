@@ -3,6 +3,11 @@ Cortex Analyst - Natural language queries powered by AI
 """
 import streamlit as st
 from datetime import timedelta
+from utils.chat_history import clear, compact, spill_directory
+from utils.cortex_pipeline import answer, generate_sql, run_sql
+from utils.result_guard import BYTE_BUDGET, PAGE_ROWS
+from utils.schema_prompt import PROMPT_TEMPLATE, get_schema_prompt
+from utils.translation_cache import get_translation_cache, schema_hash
 
 conn = st.session_state.conn
 
@@ -16,6 +21,14 @@ if "analyst_messages" not in st.session_state:
 # Semantic model path
 SEMANTIC_MODEL = "@SALES_ANALYTICS_DB.SEMANTIC.SEMANTIC_MODELS/sales_model.yaml"
 
+# Prompt sent to Cortex COMPLETE, generated from sales_model.yaml with only
+# the columns each question refers to (see utils.schema_prompt)
+schema_prompt = get_schema_prompt()
+
+# Cached translations are only reused for the same prompt and semantic model
+PROMPT_SCHEMA_HASH = schema_hash(PROMPT_TEMPLATE)
+translations = get_translation_cache()
+
 # Example questions
 with st.expander("Example Questions", expanded=False):
     st.markdown("""
@@ -28,16 +41,51 @@ with st.expander("Example Questions", expanded=False):
     - Who are our top 5 customers?
     - Show me monthly revenue trend for 2025
     """)
+    stats = translations.stats()
+    st.caption(
+        f"Translation cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']} stored questions"
+    )
+
+# Generate and run the SQL in one server-side call instead of two round trips
+single_round_trip = st.toggle(
+    "Single round trip",
+    value=True,
+    help="Generate and run the SQL inside Snowflake with SEMANTIC.ANSWER_QUESTION",
+)
+
+def render_result(pager, index):
+    """Show the rows fetched so far and offer the next page."""
+    st.dataframe(pager.table, hide_index=True, use_container_width=True)
+    if pager.truncated:
+        st.caption(f"Showing the first {pager.table.num_rows:,} rows; the answer reached its {BYTE_BUDGET // (1024 * 1024)} MB limit.")
+    elif pager.has_more:
+        st.caption(f"Showing the first {pager.table.num_rows:,} rows.")
+        if st.button("Load more rows", key=f"analyst_more_{index}"):
+            pager.fetch_page(PAGE_ROWS)
+            st.rerun()
+
+def render_stored(result, index):
+    """Show an old answer's preview; read the spilled rows only on request."""
+    if result is None:
+        st.caption("Result no longer kept in this session; the SQL above can be re-run.")
+        return
+    if result.has_more and st.toggle(f"Show all {result.rows:,} rows", key=f"analyst_full_{index}"):
+        st.dataframe(result.load(), hide_index=True, use_container_width=True)
+    else:
+        st.dataframe(result.preview, hide_index=True, use_container_width=True)
 
 # Display chat history
-for message in st.session_state.analyst_messages:
+for index, message in enumerate(st.session_state.analyst_messages):
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
         if "sql" in message:
             with st.expander("View SQL"):
                 st.code(message["sql"], language="sql")
-        if "data" in message:
-            st.dataframe(message["data"], hide_index=True)
+        if "pager" in message:
+            render_result(message["pager"], index)
+        elif "result" in message:
+            render_stored(message["result"], index)
 
 # Chat input
 if prompt := st.chat_input("Ask a question about your sales data..."):
@@ -50,32 +98,24 @@ if prompt := st.chat_input("Ask a question about your sales data..."):
     with st.chat_message("assistant"):
         with st.spinner("Analyzing..."):
             try:
-                # Call Cortex Analyst
-                response = conn.query(f"""
-                    SELECT SNOWFLAKE.CORTEX.COMPLETE(
-                        'mistral-large2',
-                        'You are a SQL expert. Given this question about sales data, generate a Snowflake SQL query.
-                        
-The data is in SALES_ANALYTICS_DB.MARTS.FCT_ORDERS with columns:
-- ORDER_ID, ORDER_DATE, CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY
-- PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY
-- SALES_REP_ID, REP_NAME, REGION (as ORDER_REGION)
-- QUANTITY, UNIT_PRICE, DISCOUNT_PCT, GROSS_AMOUNT, NET_AMOUNT, DISCOUNT_AMOUNT
-- ORDER_WEEK, ORDER_MONTH, ORDER_QUARTER, ORDER_YEAR
-
-For revenue, use NET_AMOUNT (after discounts).
-Return ONLY the SQL query, no explanation.
-
-Question: {prompt}'
-                    ) as SQL_QUERY
-                """)
+                # Reuse a previous translation of the same question if we have one
+                sql_query = translations.get(prompt, PROMPT_SCHEMA_HASH)
+                cache_hit = sql_query is not None
+                prompt_text = schema_prompt.render(prompt)
                 
-                # Extract and clean SQL
-                sql_query = response['SQL_QUERY'].iloc[0].strip()
-                sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
+                # Results are capped and paged; only a preview is fetched now
+                if cache_hit:
+                    sql_query, pager = run_sql(conn, sql_query)
+                elif single_round_trip:
+                    # Generate, clean and execute the SQL inside Snowflake
+                    sql_query, pager = answer(conn, prompt_text)
+                else:
+                    # Call Cortex Analyst, then execute the query
+                    sql_query, pager = run_sql(conn, generate_sql(conn, prompt_text))
                 
-                # Execute the query
-                result_df = conn.query(sql_query)
+                # Only cache SQL that actually ran
+                if not cache_hit:
+                    translations.put(prompt, PROMPT_SCHEMA_HASH, sql_query)
                 
                 # Format response
                 response_text = f"Here are the results for: *{prompt}*"
@@ -84,16 +124,19 @@ Question: {prompt}'
                 with st.expander("View SQL", expanded=False):
                     st.code(sql_query, language="sql")
                 
-                st.dataframe(result_df, hide_index=True, use_container_width=True)
+                render_result(pager, len(st.session_state.analyst_messages))
                 
                 # Save to history
                 st.session_state.analyst_messages.append({
                     "role": "assistant",
                     "content": response_text,
                     "sql": sql_query,
-                    "data": result_df
+                    "pager": pager
                 })
                 
+                # Keep only the newest answer live; spill or drop the rest
+                compact(st.session_state.analyst_messages, spill_directory(st.session_state))
+                
             except Exception as e:
                 error_msg = f"Sorry, I couldn't process that question. Error: {str(e)}"
                 st.error(error_msg)
@@ -105,5 +148,6 @@ Question: {prompt}'
 # Clear chat button
 if st.session_state.analyst_messages:
     if st.button("Clear Chat", type="secondary"):
+        clear(st.session_state.analyst_messages)
         st.session_state.analyst_messages = []
         st.rerun()
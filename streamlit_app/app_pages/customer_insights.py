@@ -2,8 +2,11 @@
 Customer Insights - Customer segmentation and analysis
 """
 import streamlit as st
-from datetime import timedelta
 import pandas as pd
+from utils import page_queries
+from utils.batch_loader import load_all, prefetch
+from utils.instrumentation import instrumented
+from utils.range_cache import run_cached
 
 conn = st.session_state.conn
 date_start = st.session_state.date_start
@@ -11,71 +14,40 @@ date_end = st.session_state.date_end
 
 st.title(":material/groups: Customer Insights")
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_segment_summary(_conn, start_date, end_date):
+@instrumented
+def get_segment_summary(conn, start_date, end_date):
     """Fetch summary by customer segment."""
-    query = f"""
-    SELECT 
-        CUSTOMER_SEGMENT as SEGMENT,
-        COUNT(DISTINCT CUSTOMER_ID) as CUSTOMER_COUNT,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as ORDER_COUNT,
-        AVG(NET_AMOUNT) as AVG_ORDER_VALUE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY CUSTOMER_SEGMENT
-    ORDER BY TOTAL_REVENUE DESC
-    """
-    return _conn.query(query)
-
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_top_customers(_conn, start_date, end_date, limit=25):
-    """Fetch top customers by revenue."""
-    query = f"""
-    SELECT 
-        CUSTOMER_NAME,
-        CUSTOMER_SEGMENT as SEGMENT,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as ORDER_COUNT,
-        ROUND(AVG(NET_AMOUNT), 2) as AVG_ORDER_VALUE,
-        MIN(ORDER_DATE) as FIRST_ORDER_DATE,
-        MAX(ORDER_DATE) as LAST_ORDER_DATE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY CUSTOMER_NAME, CUSTOMER_SEGMENT
-    ORDER BY TOTAL_REVENUE DESC
-    LIMIT {limit}
+    return run_cached(conn, page_queries.segment_summary(start_date, end_date))
+
+@instrumented
+def get_customer_page(conn, start_date, end_date, segment=None, after=None, page_size=50):
+    """Fetch one page of customers ranked by revenue.
+
+    after is the (TOTAL_REVENUE, CUSTOMER_ID) of the last row of the previous
+    page. One extra row is fetched to tell whether another page follows.
+    Dated rankings read whole months from SALES_BY_CUSTOMER_MONTH; without
+    dates the ranking is all-time, served from SALES_BY_CUSTOMER.
     """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.customer_page(start_date, end_date, segment, after, page_size))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_industry_breakdown(_conn, start_date, end_date):
+@instrumented
+def get_industry_breakdown(conn, start_date, end_date):
     """Fetch revenue by industry."""
-    query = f"""
-    SELECT 
-        INDUSTRY,
-        COUNT(DISTINCT CUSTOMER_ID) as CUSTOMER_COUNT,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as ORDER_COUNT
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY INDUSTRY
-    ORDER BY TOTAL_REVENUE DESC
-    LIMIT 10
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.industry_breakdown(start_date, end_date))
 
 # Load data with error handling and loading state
 data_loaded = False
 segment_data = pd.DataFrame()
-top_customers = pd.DataFrame()
 industry_data = pd.DataFrame()
 
 with st.spinner("Loading customer data..."):
     try:
-        segment_data = get_segment_summary(conn, date_start, date_end)
-        top_customers = get_top_customers(conn, date_start, date_end)
-        industry_data = get_industry_breakdown(conn, date_start, date_end)
+        results = load_all({
+            "segment_data": (get_segment_summary, conn, date_start, date_end),
+            "industry_data": (get_industry_breakdown, conn, date_start, date_end),
+        })
+        segment_data = results["segment_data"]
+        industry_data = results["industry_data"]
         data_loaded = True
     except Exception as e:
         st.error(f"Failed to load customer data: {str(e)}")
@@ -107,33 +79,72 @@ if data_loaded and len(segment_data) > 0:
             if len(industry_data) > 0:
                 st.bar_chart(industry_data.head(10), x="INDUSTRY", y="TOTAL_REVENUE", height=300, horizontal=True)
 
-    # Top customers table
+    # Top customers table, paged by keyset so only one page is transferred
     st.subheader("Top Customers")
-    if len(top_customers) > 0:
-        # Segment filter
-        segments = top_customers['SEGMENT'].unique().tolist()
+    filter_col, scope_col = st.columns([3, 1])
+    with filter_col:
+        segments = segment_data['SEGMENT'].tolist()
         selected_segment = st.selectbox("Filter by Segment", ["All Segments"] + segments)
-        
-        if selected_segment != "All Segments":
-            filtered_customers = top_customers[top_customers['SEGMENT'] == selected_segment]
-        else:
-            filtered_customers = top_customers
-        
-        with st.container(border=True):
-            st.dataframe(
-                filtered_customers,
-                hide_index=True,
-                column_config={
-                    "CUSTOMER_NAME": "Customer",
-                    "SEGMENT": "Segment",
-                    "TOTAL_REVENUE": st.column_config.NumberColumn("Total Revenue", format="$%.0f"),
-                    "ORDER_COUNT": st.column_config.NumberColumn("Orders", format="%d"),
-                    "AVG_ORDER_VALUE": st.column_config.NumberColumn("AOV", format="$%.2f"),
-                    "FIRST_ORDER_DATE": st.column_config.DateColumn("First Order"),
-                    "LAST_ORDER_DATE": st.column_config.DateColumn("Last Order"),
-                },
-                use_container_width=True,
-                height=400
-            )
+    with scope_col:
+        all_time = st.toggle("All time", help="Rank by lifetime revenue instead of the selected period")
+
+    segment = None if selected_segment == "All Segments" else selected_segment
+    page_start, page_end = (None, None) if all_time else (date_start, date_end)
+
+    # Cursors of the pages visited so far; reset whenever the listing changes
+    listing = (page_start, page_end, segment)
+    if st.session_state.get("customer_listing") != listing:
+        st.session_state.customer_listing = listing
+        st.session_state.customer_cursors = [None]
+    cursors = st.session_state.customer_cursors
+    page_size = 50
+
+    try:
+        page = get_customer_page(conn, page_start, page_end, segment, cursors[-1], page_size)
+    except Exception as e:
+        st.error(f"Failed to load customers: {str(e)}")
+        page = pd.DataFrame()
+
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+    next_cursor = None
+    if has_next:
+        last = page.iloc[-1]
+        next_cursor = (last['TOTAL_REVENUE'].item(), last['CUSTOMER_ID'].item())
+
+    with st.container(border=True):
+        st.dataframe(
+            page,
+            hide_index=True,
+            column_config={
+                "CUSTOMER_ID": None,
+                "CUSTOMER_NAME": "Customer",
+                "SEGMENT": "Segment",
+                "TOTAL_REVENUE": st.column_config.NumberColumn("Total Revenue", format="$%.0f"),
+                "ORDER_COUNT": st.column_config.NumberColumn("Orders", format="%d"),
+                "AVG_ORDER_VALUE": st.column_config.NumberColumn("AOV", format="$%.2f"),
+                "FIRST_ORDER_DATE": st.column_config.DateColumn("First Order"),
+                "LAST_ORDER_DATE": st.column_config.DateColumn("Last Order"),
+            },
+            use_container_width=True,
+            height=400
+        )
+
+        prev_col, position_col, next_col = st.columns([1, 4, 1])
+        with prev_col:
+            if st.button("Previous", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with position_col:
+            first = (len(cursors) - 1) * page_size + 1
+            st.caption(f"Customers {first:,}–{first + len(page) - 1:,}" if len(page) else "No customers")
+        with next_col:
+            if st.button("Next", disabled=not has_next, use_container_width=True):
+                cursors.append(next_cursor)
+                st.rerun()
+
+    if has_next:
+        # Warm the cache so Next is instant
+        prefetch(get_customer_page, conn, page_start, page_end, segment, next_cursor, page_size)
 elif data_loaded:
     st.info("No customer data available for selected period")
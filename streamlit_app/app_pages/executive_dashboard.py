@@ -2,8 +2,12 @@
 Executive Dashboard - KPIs and high-level metrics
 """
 import streamlit as st
-from datetime import timedelta
 import pandas as pd
+from utils import page_queries
+from utils.batch_loader import load_all
+from utils.instrumentation import instrumented
+from utils.kpi_snapshot import snapshot_kpis
+from utils.range_cache import run_cached
 
 # Get connection and date filters from session state
 conn = st.session_state.conn
@@ -13,52 +17,24 @@ date_end = st.session_state.date_end
 st.title(":material/dashboard: Executive Dashboard")
 
 # Fetch KPI data
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_kpis(_conn, start_date, end_date):
+@instrumented
+def get_kpis(conn, start_date, end_date):
     """Fetch KPI metrics for the date range."""
-    query = f"""
-    SELECT 
-        SUM(NET_AMOUNT) as total_revenue,
-        SUM(GROSS_AMOUNT) as gross_revenue,
-        SUM(DISCOUNT_AMOUNT) as total_discounts,
-        COUNT(*) as order_count,
-        COUNT(DISTINCT CUSTOMER_ID) as customer_count,
-        SUM(QUANTITY) as units_sold,
-        AVG(NET_AMOUNT) as avg_order_value
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    """
-    return _conn.query(query)
+    # Preset ranges are precomputed in KPI_SNAPSHOT
+    kpis = snapshot_kpis(conn, start_date, end_date)
+    if kpis is not None:
+        return kpis
+    return run_cached(conn, page_queries.kpis(start_date, end_date))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_daily_trend(_conn, start_date, end_date):
+@instrumented
+def get_daily_trend(conn, start_date, end_date):
     """Fetch daily revenue trend."""
-    query = f"""
-    SELECT 
-        ORDER_DATE,
-        SUM(REVENUE) as REVENUE,
-        SUM(ORDER_COUNT) as ORDERS
-    FROM SALES_ANALYTICS_DB.MARTS.DAILY_SALES
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY ORDER_DATE
-    ORDER BY ORDER_DATE
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.daily_trend(start_date, end_date))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_region_breakdown(_conn, start_date, end_date):
+@instrumented
+def get_region_breakdown(conn, start_date, end_date):
     """Fetch revenue by region."""
-    query = f"""
-    SELECT 
-        ORDER_REGION as REGION,
-        SUM(NET_AMOUNT) as REVENUE,
-        COUNT(*) as ORDERS
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY ORDER_REGION
-    ORDER BY REVENUE DESC
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.region_breakdown(start_date, end_date))
 
 # Load data with error handling and loading state
 data_loaded = False
@@ -68,9 +44,14 @@ region_data = pd.DataFrame()
 
 with st.spinner("Loading dashboard data..."):
     try:
-        kpis = get_kpis(conn, date_start, date_end)
-        daily_trend = get_daily_trend(conn, date_start, date_end)
-        region_data = get_region_breakdown(conn, date_start, date_end)
+        results = load_all({
+            "kpis": (get_kpis, conn, date_start, date_end),
+            "daily_trend": (get_daily_trend, conn, date_start, date_end),
+            "region_data": (get_region_breakdown, conn, date_start, date_end),
+        })
+        kpis = results["kpis"]
+        daily_trend = results["daily_trend"]
+        region_data = results["region_data"]
         data_loaded = True
     except Exception as e:
         st.error(f"Failed to load dashboard data: {str(e)}")
@@ -158,9 +139,8 @@ if data_loaded:
     with col2:
         with st.expander("Regional Breakdown Detail", expanded=False):
             if len(region_data) > 0:
-                # Calculate percentage of total (convert to float for arithmetic)
+                # Calculate percentage of total (REVENUE arrives as float64)
                 region_detail = region_data.copy()
-                region_detail['REVENUE'] = region_detail['REVENUE'].astype(float)
                 total_rev = region_detail['REVENUE'].sum()
                 region_detail['PCT_OF_TOTAL'] = (region_detail['REVENUE'] / total_rev * 100).round(1)
                 st.dataframe(
@@ -2,8 +2,11 @@
 Product Analysis - Sales performance by product and category
 """
 import streamlit as st
-from datetime import timedelta
 import pandas as pd
+from utils import page_queries
+from utils.batch_loader import load_all
+from utils.instrumentation import instrumented
+from utils.range_cache import run_cached
 
 conn = st.session_state.conn
 date_start = st.session_state.date_start
@@ -11,66 +14,39 @@ date_end = st.session_state.date_end
 
 st.title(":material/inventory_2: Product Analysis")
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_category_summary(_conn, start_date, end_date):
+@instrumented
+def get_category_summary(conn, start_date, end_date):
     """Fetch category-level summary."""
-    query = f"""
-    SELECT 
-        CATEGORY,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as TOTAL_ORDERS,
-        SUM(QUANTITY) as TOTAL_UNITS
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY CATEGORY
-    ORDER BY TOTAL_REVENUE DESC
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.category_summary(start_date, end_date))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_top_products(_conn, start_date, end_date, limit=20):
-    """Fetch top products by revenue."""
-    query = f"""
-    SELECT 
-        PRODUCT_NAME,
-        CATEGORY,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as TOTAL_ORDERS,
-        SUM(QUANTITY) as TOTAL_UNITS
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY PRODUCT_NAME, CATEGORY
-    ORDER BY TOTAL_REVENUE DESC
-    LIMIT {limit}
-    """
-    return _conn.query(query)
+@instrumented
+def get_top_products(conn, start_date, end_date, categories, per_category=5):
+    """Fetch the top products by revenue within each selected category."""
+    return run_cached(conn, page_queries.top_products(start_date, end_date, categories, per_category))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_category_trend(_conn, start_date, end_date):
+@instrumented
+def get_category_products(conn, start_date, end_date, category, limit=50):
+    """Fetch the top products of one category for its drill-down."""
+    return run_cached(conn, page_queries.category_products(start_date, end_date, category, limit))
+
+@instrumented
+def get_category_trend(conn, start_date, end_date):
     """Fetch monthly trend by category."""
-    query = f"""
-    SELECT 
-        DATE_TRUNC('month', ORDER_DATE) as MONTH,
-        CATEGORY,
-        SUM(NET_AMOUNT) as REVENUE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY DATE_TRUNC('month', ORDER_DATE), CATEGORY
-    ORDER BY MONTH, CATEGORY
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.category_trend(start_date, end_date))
 
 # Load data with error handling and loading state
 data_loaded = False
 category_summary = pd.DataFrame()
-top_products = pd.DataFrame()
 category_trend = pd.DataFrame()
 
 with st.spinner("Loading product data..."):
     try:
-        category_summary = get_category_summary(conn, date_start, date_end)
-        top_products = get_top_products(conn, date_start, date_end)
-        category_trend = get_category_trend(conn, date_start, date_end)
+        results = load_all({
+            "category_summary": (get_category_summary, conn, date_start, date_end),
+            "category_trend": (get_category_trend, conn, date_start, date_end),
+        })
+        category_summary = results["category_summary"]
+        category_trend = results["category_trend"]
         data_loaded = True
     except Exception as e:
         st.error(f"Failed to load product data: {str(e)}")
@@ -109,12 +85,16 @@ if data_loaded and len(category_summary) > 0:
             pivot = trend_filtered.pivot(index='MONTH', columns='CATEGORY', values='REVENUE')
             st.line_chart(pivot, height=350)
     
-    # Top products table
-    st.subheader("Top Products")
+    # Top products table: ranked per category in the warehouse
+    st.subheader("Top Products by Category")
     with st.container(border=True):
-        products_filtered = top_products[top_products['CATEGORY'].isin(selected_categories)]
+        try:
+            top_products = get_top_products(conn, date_start, date_end, selected_categories)
+        except Exception as e:
+            st.warning(f"Could not load top products: {str(e)}")
+            top_products = pd.DataFrame()
         st.dataframe(
-            products_filtered,
+            top_products,
             hide_index=True,
             column_config={
                 "PRODUCT_NAME": "Product",
@@ -158,16 +138,19 @@ if data_loaded and len(category_summary) > 0:
                     st.markdown("**Monthly Revenue Trend**")
                     st.line_chart(cat_trend, x="MONTH", y="REVENUE", height=200)
             
-            # Products in this category
-            st.markdown("**Products in Category**")
-            cat_products = top_products[top_products['CATEGORY'] == selected_drill_cat]
+            # Products in this category, fetched only for the category drilled into
+            st.markdown("**Top Products in Category**")
+            try:
+                cat_products = get_category_products(conn, date_start, date_end, selected_drill_cat)
+            except Exception as e:
+                st.warning(f"Could not load category products: {str(e)}")
+                cat_products = pd.DataFrame()
             if len(cat_products) > 0:
                 st.dataframe(
                     cat_products,
                     hide_index=True,
                     column_config={
                         "PRODUCT_NAME": "Product",
-                        "CATEGORY": None,  # Hide category column
                         "TOTAL_REVENUE": st.column_config.NumberColumn("Revenue", format="$%.0f"),
                         "TOTAL_ORDERS": st.column_config.NumberColumn("Orders", format="%d"),
                         "TOTAL_UNITS": st.column_config.NumberColumn("Units", format="%d"),
@@ -176,6 +159,6 @@ if data_loaded and len(category_summary) > 0:
                     height=250
                 )
             else:
-                st.info("No products in top 20 for this category")
+                st.info("No product sales for this category in the selected period")
 elif data_loaded:
     st.info("No product data available for selected period")
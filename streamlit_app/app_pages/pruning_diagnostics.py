@@ -0,0 +1,79 @@
+"""
+Pruning Diagnostics - Partitions scanned by each registered page query
+"""
+import streamlit as st
+import pandas as pd
+from dataclasses import asdict
+from utils.pruning import MIN_PARTITIONS, POOR_PRUNING, diagnose
+from utils.range_cache import recent_queries
+
+conn = st.session_state.conn
+
+st.title(":material/content_cut: Pruning Diagnostics")
+st.caption(
+    "Replays the page queries recorded for the warmer with the result cache off and reads "
+    "partitions scanned versus total from each query profile"
+)
+
+registered = recent_queries()
+windows = sorted({days for _, days in registered})
+selected_windows = st.multiselect("Windows (days)", options=windows, default=windows)
+
+if st.button("Run diagnostics", type="primary", disabled=not registered):
+    with st.spinner(f"Running {len(registered)} page queries..."):
+        try:
+            st.session_state.pruning_reports = diagnose(conn, windows=set(selected_windows))
+        except Exception as e:
+            st.session_state.pruning_reports = None
+            st.info(f"Pruning diagnostics unavailable: {str(e)}")
+
+if not registered:
+    st.info("No page queries recorded yet. Visit the dashboard pages with a range ending today first.")
+
+reports = st.session_state.get("pruning_reports")
+if reports:
+    frame = pd.DataFrame([
+        {**asdict(report), "scanned_share": report.scanned_share, "poor": report.poor}
+        for report in reports
+    ]).sort_values(["poor", "scanned_share"], ascending=False)
+    poor = frame[frame['poor']]
+
+    # KPI cards
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Table Scans", f"{len(frame):,}")
+    with col2:
+        st.metric("Poorly Pruned", f"{len(poor):,}")
+    with col3:
+        st.metric("Data Scanned", f"{frame['bytes_scanned'].fillna(0).sum() / 1e6:,.1f} MB")
+
+    for row in poor.itertuples():
+        st.warning(
+            f"**{row.query}** scans {row.partitions_scanned:,} of {row.partitions_total:,} "
+            f"partitions of {row.table} ({row.scanned_share:.0%})"
+        )
+    st.caption(
+        f"Flagged: more than {POOR_PRUNING:.0%} of partitions scanned on tables with at least "
+        f"{MIN_PARTITIONS} partitions"
+    )
+
+    with st.container(border=True):
+        st.dataframe(
+            frame[['query', 'source', 'table', 'window_days', 'partitions_scanned', 'partitions_total',
+                   'scanned_share', 'bytes_scanned', 'query_id']],
+            hide_index=True,
+            column_config={
+                "query": st.column_config.TextColumn("Query"),
+                "source": st.column_config.TextColumn("Planned From"),
+                "table": st.column_config.TextColumn("Table Scanned"),
+                "window_days": st.column_config.NumberColumn("Window", format="%d d"),
+                "partitions_scanned": st.column_config.NumberColumn("Scanned", format="%d"),
+                "partitions_total": st.column_config.NumberColumn("Total", format="%d"),
+                "scanned_share": st.column_config.ProgressColumn("Share", min_value=0, max_value=1, format="%.2f"),
+                "bytes_scanned": st.column_config.NumberColumn("Bytes", format="%d"),
+                "query_id": st.column_config.TextColumn("Query ID"),
+            },
+            use_container_width=True
+        )
+elif reports is not None and len(reports) == 0:
+    st.info("The replayed queries scanned no tables")
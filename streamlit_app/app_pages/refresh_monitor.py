@@ -0,0 +1,112 @@
+"""
+Refresh Monitor - Refresh mode, duration and rows processed per Dynamic Table
+"""
+import streamlit as st
+import pandas as pd
+from utils.batch_loader import load_all
+from utils.instrumentation import instrumented
+from utils.refresh_monitor import duration_trend, needs_attention, refresh_history, summarize, table_settings
+
+conn = st.session_state.conn
+
+st.title(":material/monitor_heart: Refresh Monitor")
+st.caption("How the MARTS Dynamic Tables actually refreshed, from Snowflake's refresh history")
+
+WINDOWS = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 168}
+
+@instrumented
+def get_table_settings(conn):
+    """Fetch configured refresh mode and target lag of each mart."""
+    return table_settings(conn)
+
+@instrumented
+def get_refresh_history(conn, hours):
+    """Fetch the refreshes of the last `hours` hours."""
+    return refresh_history(conn, hours)
+
+window = st.selectbox("Window", options=list(WINDOWS), index=1)
+
+# Load data with error handling and loading state
+data_loaded = False
+settings = pd.DataFrame()
+history = pd.DataFrame()
+
+with st.spinner("Loading refresh history..."):
+    try:
+        results = load_all({
+            "settings": (get_table_settings, conn),
+            "history": (get_refresh_history, conn, WINDOWS[window]),
+        })
+        settings = results["settings"]
+        history = results["history"]
+        data_loaded = True
+    except Exception as e:
+        st.info(
+            "Refresh history is only available on Snowflake, with MONITOR on the "
+            f"MARTS Dynamic Tables: {str(e)}"
+        )
+
+if data_loaded and len(settings) > 0:
+    summary = summarize(settings, history)
+    attention = needs_attention(summary)
+
+    # KPI cards
+    col1, col2, col3, col4 = st.columns(4)
+    worked = history[(history['STATE'] == 'SUCCEEDED') & (history['REFRESH_ACTION'] != 'NO_DATA')]
+    with col1:
+        st.metric("Refreshes", f"{len(history):,}", help="Including refreshes that found no new data")
+    with col2:
+        incremental = (worked['REFRESH_ACTION'] == 'INCREMENTAL').mean() if len(worked) > 0 else 0
+        st.metric("Incremental", f"{incremental:.0%}", help="Share of refreshes that processed data")
+    with col3:
+        st.metric("Refresh Time", f"{worked['DURATION_MS'].sum() / 60000:,.1f} min")
+    with col4:
+        st.metric("Tables Flagged", f"{len(attention)}")
+
+    for row in attention.itertuples():
+        reasons = []
+        if row.FELL_BACK:
+            reasons.append(f"fell back to {row.REFRESH_MODE} refresh: {row.REFRESH_MODE_REASON}")
+        elif str(row.REFRESH_MODE).upper() != "INCREMENTAL":
+            reasons.append(f"refresh mode is {row.REFRESH_MODE} ({row.REFRESH_MODE_REASON})")
+        if row.FULL_REFRESHES > 0:
+            reasons.append(f"{row.FULL_REFRESHES} full or re-initialising refreshes")
+        if row.FAILED > 0:
+            reasons.append(f"{row.FAILED} failed refreshes")
+        st.warning(f"**{row.NAME}**: {'; '.join(reasons)}")
+
+    # Summary table
+    st.subheader("Tables")
+    with st.container(border=True):
+        st.dataframe(
+            summary[[
+                'NAME', 'REFRESH_MODE', 'TARGET_LAG', 'LAST_ACTION', 'INCREMENTAL', 'FULL',
+                'REINITIALIZE', 'NO_DATA', 'FAILED', 'AVG_DURATION_MS', 'MAX_DURATION_MS',
+                'AVG_ROWS_PROCESSED', 'SCHEDULING_STATE',
+            ]],
+            hide_index=True,
+            column_config={
+                "REFRESH_MODE": st.column_config.TextColumn("Mode"),
+                "TARGET_LAG": st.column_config.TextColumn("Target Lag"),
+                "LAST_ACTION": st.column_config.TextColumn("Last Refresh"),
+                "NO_DATA": st.column_config.NumberColumn("No Data", format="%d"),
+                "AVG_DURATION_MS": st.column_config.NumberColumn("Avg ms", format="%.0f"),
+                "MAX_DURATION_MS": st.column_config.NumberColumn("Max ms", format="%.0f"),
+                "AVG_ROWS_PROCESSED": st.column_config.NumberColumn("Avg Rows Processed", format="%.0f"),
+                "SCHEDULING_STATE": st.column_config.TextColumn("State"),
+            },
+            use_container_width=True
+        )
+
+    # Duration trend
+    trend = duration_trend(history)
+    if len(trend) > 0:
+        st.subheader("Refresh Duration (ms)")
+        with st.container(border=True):
+            st.line_chart(trend, height=350)
+
+    # Raw history
+    with st.expander("Refresh History", expanded=False):
+        st.dataframe(history, hide_index=True, use_container_width=True)
+elif data_loaded:
+    st.info("No Dynamic Tables found in MARTS")
@@ -2,8 +2,11 @@
 Regional Analysis - Sales performance by geographic region
 """
 import streamlit as st
-from datetime import timedelta
 import pandas as pd
+from utils import page_queries
+from utils.batch_loader import load_all
+from utils.instrumentation import instrumented
+from utils.range_cache import run_cached
 
 conn = st.session_state.conn
 date_start = st.session_state.date_start
@@ -11,40 +14,15 @@ date_end = st.session_state.date_end
 
 st.title(":material/map: Regional Analysis")
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_regional_data(_conn, start_date, end_date):
+@instrumented
+def get_regional_data(conn, start_date, end_date):
     """Fetch regional sales data by month."""
-    query = f"""
-    SELECT 
-        ORDER_REGION as REGION,
-        DATE_TRUNC('month', ORDER_DATE) as ORDER_MONTH,
-        SUM(NET_AMOUNT) as REVENUE,
-        COUNT(*) as ORDER_COUNT,
-        COUNT(DISTINCT CUSTOMER_ID) as CUSTOMER_COUNT,
-        AVG(NET_AMOUNT) as AVG_ORDER_VALUE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY ORDER_REGION, DATE_TRUNC('month', ORDER_DATE)
-    ORDER BY ORDER_MONTH, REGION
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.regional_data(start_date, end_date))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_regional_summary(_conn, start_date, end_date):
+@instrumented
+def get_regional_summary(conn, start_date, end_date):
     """Fetch regional summary totals."""
-    query = f"""
-    SELECT 
-        ORDER_REGION as REGION,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as TOTAL_ORDERS,
-        COUNT(DISTINCT CUSTOMER_ID) as TOTAL_CUSTOMERS,
-        ROUND(AVG(NET_AMOUNT), 2) as AVG_ORDER_VALUE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY ORDER_REGION
-    ORDER BY TOTAL_REVENUE DESC
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.regional_summary(start_date, end_date))
 
 # Load data with error handling and loading state
 data_loaded = False
@@ -53,8 +31,12 @@ regional_summary = pd.DataFrame()
 
 with st.spinner("Loading regional data..."):
     try:
-        regional_data = get_regional_data(conn, date_start, date_end)
-        regional_summary = get_regional_summary(conn, date_start, date_end)
+        results = load_all({
+            "regional_data": (get_regional_data, conn, date_start, date_end),
+            "regional_summary": (get_regional_summary, conn, date_start, date_end),
+        })
+        regional_data = results["regional_data"]
+        regional_summary = results["regional_summary"]
         data_loaded = True
     except Exception as e:
         st.error(f"Failed to load regional data: {str(e)}")
@@ -2,8 +2,11 @@
 Sales Rep Leaderboard - Performance rankings and metrics
 """
 import streamlit as st
-from datetime import timedelta
 import pandas as pd
+from utils import page_queries
+from utils.batch_loader import load_all
+from utils.instrumentation import instrumented
+from utils.range_cache import run_cached
 
 conn = st.session_state.conn
 date_start = st.session_state.date_start
@@ -11,48 +14,36 @@ date_end = st.session_state.date_end
 
 st.title(":material/leaderboard: Sales Rep Leaderboard")
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_rep_rankings(_conn, start_date, end_date):
+@instrumented
+def get_rep_rankings(conn, start_date, end_date):
     """Fetch sales rep performance rankings."""
-    query = f"""
-    SELECT 
-        REP_NAME,
-        REP_REGION as REGION,
-        SUM(NET_AMOUNT) as TOTAL_REVENUE,
-        COUNT(*) as TOTAL_ORDERS,
-        COUNT(DISTINCT CUSTOMER_ID) as TOTAL_CUSTOMERS,
-        ROUND(AVG(NET_AMOUNT), 2) as AVG_ORDER_VALUE
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY REP_NAME, REP_REGION
-    ORDER BY TOTAL_REVENUE DESC
-    """
-    return _conn.query(query)
+    return run_cached(conn, page_queries.rep_rankings(start_date, end_date))
 
-@st.cache_data(ttl=timedelta(minutes=5))
-def get_rep_trend(_conn, start_date, end_date, rep_name):
-    """Fetch monthly trend for a specific rep."""
-    query = f"""
-    SELECT 
-        DATE_TRUNC('month', ORDER_DATE) as MONTH,
-        SUM(NET_AMOUNT) as REVENUE,
-        COUNT(*) as ORDER_COUNT,
-        COUNT(DISTINCT CUSTOMER_ID) as CUSTOMER_COUNT
-    FROM SALES_ANALYTICS_DB.MARTS.FCT_ORDERS
-    WHERE REP_NAME = '{rep_name}'
-      AND ORDER_DATE BETWEEN '{start_date}' AND '{end_date}'
-    GROUP BY DATE_TRUNC('month', ORDER_DATE)
-    ORDER BY MONTH
-    """
-    return _conn.query(query)
+@instrumented
+def get_rep_trends(conn, start_date, end_date):
+    """Fetch the monthly trend of every rep in one query."""
+    return run_cached(conn, page_queries.rep_trends(start_date, end_date))
 
-# Load rankings with error handling and loading state
+def index_by_rep(trends):
+    """Split the combined trends into one frame per rep for instant lookup."""
+    return {
+        rep_name: group.drop(columns="REP_NAME").reset_index(drop=True)
+        for rep_name, group in trends.groupby("REP_NAME", sort=False)
+    }
+
+# Load rankings and every rep's trend up front, so picking a rep needs no query
 data_loaded = False
 rankings = pd.DataFrame()
+trends_by_rep = {}
 
 with st.spinner("Loading sales rep data..."):
     try:
-        rankings = get_rep_rankings(conn, date_start, date_end)
+        results = load_all({
+            "rankings": (get_rep_rankings, conn, date_start, date_end),
+            "trends": (get_rep_trends, conn, date_start, date_end),
+        })
+        rankings = results["rankings"]
+        trends_by_rep = index_by_rep(results["trends"])
         data_loaded = True
     except Exception as e:
         st.error(f"Failed to load sales rep data: {str(e)}")
@@ -124,7 +115,7 @@ if data_loaded and len(rankings) > 0:
     
     if selected_rep:
         try:
-            rep_trend = get_rep_trend(conn, date_start, date_end, selected_rep)
+            rep_trend = trends_by_rep.get(selected_rep, pd.DataFrame())
             rep_info = filtered[filtered['REP_NAME'] == selected_rep].iloc[0]
             
             col1, col2 = st.columns(2)
@@ -4,6 +4,13 @@ Built on Snowflake Dynamic Tables with Cortex Analyst integration
 """
 import streamlit as st
 from datetime import datetime, timedelta
+from utils.connection_pool import snowflake_pool
+from utils.freshness import recheck
+from utils.instrumentation import render_overlay, start_run
+from utils.kpi_snapshot import preset_range
+from utils.local_warehouse import connect_local, warehouse_backend
+from utils.schema_prompt import get_schema_prompt
+from utils.warmer import start_warmer
 
 # Page configuration
 st.set_page_config(
@@ -13,14 +20,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Snowflake connection with retry logic
+# Initialize Snowflake connection pool, shared by all sessions
 @st.cache_resource
 def get_connection():
-    """Get cached Snowflake connection with error handling."""
+    """Get cached Snowflake connection pool (or local DuckDB connection) with error handling."""
     try:
-        conn = st.connection("snowflake")
+        if warehouse_backend() == "local":
+            conn = connect_local()
+        else:
+            # Sessions are health checked on checkout and reconnected when expired
+            conn = snowflake_pool()
         # Test connection with simple query
         conn.query("SELECT 1")
+        # Resume the warehouse and pre-run page queries in the background
+        start_warmer(conn)
         return conn
     except Exception as e:
         st.error(f"Failed to connect to Snowflake: {str(e)}")
@@ -35,12 +48,30 @@ if st.session_state.conn is None:
     st.error("Unable to establish Snowflake connection. Please check your configuration.")
     st.stop()
 
+# Compile the Cortex schema prompt from sales_model.yaml once per process
+try:
+    get_schema_prompt()
+except ImportError:
+    pass  # Ask Cortex reports the missing PyYAML
+
 # Default date range (last 12 months)
 if "date_start" not in st.session_state:
     st.session_state.date_start = datetime.now().date() - timedelta(days=365)
 if "date_end" not in st.session_state:
     st.session_state.date_end = datetime.now().date()
 
+# The date inputs keep their own state; seed it once so presets can set it
+if "filter_date_start" not in st.session_state:
+    st.session_state.filter_date_start = st.session_state.date_start
+if "filter_date_end" not in st.session_state:
+    st.session_state.filter_date_end = st.session_state.date_end
+
+def apply_preset(preset):
+    """Set the date range (and the date inputs, which keep their own state) to a preset."""
+    start, end = preset_range(preset)
+    st.session_state.date_start = st.session_state.filter_date_start = start
+    st.session_state.date_end = st.session_state.filter_date_end = end
+
 # Define navigation pages
 pages = {
     "": [
@@ -55,6 +86,10 @@ pages = {
     "AI": [
         st.Page("app_pages/cortex_analyst.py", title="Ask Cortex", icon=":material/smart_toy:"),
     ],
+    "Operations": [
+        st.Page("app_pages/refresh_monitor.py", title="Refresh Monitor", icon=":material/monitor_heart:"),
+        st.Page("app_pages/pruning_diagnostics.py", title="Pruning Diagnostics", icon=":material/content_cut:"),
+    ],
 }
 
 # Create navigation
@@ -70,13 +105,11 @@ with st.sidebar:
     with col1:
         date_start = st.date_input(
             "Start Date",
-            value=st.session_state.date_start,
             key="filter_date_start"
         )
     with col2:
         date_end = st.date_input(
             "End Date", 
-            value=st.session_state.date_end,
             key="filter_date_end"
         )
     
@@ -89,34 +122,27 @@ with st.sidebar:
     st.session_state.date_start = date_start
     st.session_state.date_end = date_end
     
-    # Quick date presets
+    # Quick date presets (served from KPI_SNAPSHOT on the dashboard)
     st.markdown("**Quick Select:**")
-    preset_cols = st.columns(3)
-    with preset_cols[0]:
-        if st.button("30D", use_container_width=True):
-            st.session_state.date_start = datetime.now().date() - timedelta(days=30)
-            st.session_state.date_end = datetime.now().date()
-            st.rerun()
-    with preset_cols[1]:
-        if st.button("90D", use_container_width=True):
-            st.session_state.date_start = datetime.now().date() - timedelta(days=90)
-            st.session_state.date_end = datetime.now().date()
-            st.rerun()
-    with preset_cols[2]:
-        if st.button("1Y", use_container_width=True):
-            st.session_state.date_start = datetime.now().date() - timedelta(days=365)
-            st.session_state.date_end = datetime.now().date()
-            st.rerun()
+    for row in (("30D", "90D", "1Y"), ("MTD", "QTD", "YTD")):
+        preset_cols = st.columns(3)
+        for col, preset in zip(preset_cols, row):
+            with col:
+                st.button(preset, use_container_width=True, on_click=apply_preset, args=(preset,))
     
     st.markdown("---")
     
-    # Cache control
+    # Cache control: re-read Dynamic Table refresh state so only results
+    # whose source tables have new data are reloaded
     if st.button("Refresh Data", use_container_width=True, type="secondary"):
-        st.cache_data.clear()
+        recheck()
         st.rerun()
     
     st.caption("Data refreshes every 5 minutes via Dynamic Tables")
     
+    # Per-query timings for this page, rendered after the page has run
+    show_overlay = st.toggle("Performance overlay", key="perf_overlay")
+    
     # About section with documentation
     st.markdown("---")
     with st.expander("About This Platform", expanded=False):
@@ -132,6 +158,8 @@ with st.sidebar:
         - **Sales Rep Leaderboard**: Rep performance rankings
         - **Customer Insights**: Segment analysis
         - **Ask Cortex**: AI-powered natural language queries
+        - **Refresh Monitor**: Dynamic Table refresh modes and cost
+        - **Pruning Diagnostics**: Partitions scanned by page queries
         
         **Data:**
         - Source: SALES_ANALYTICS_DB
@@ -145,4 +173,9 @@ with st.sidebar:
         """)
 
 # Run the selected page
+start_run(page.title)
 page.run()
+
+if show_overlay:
+    with st.sidebar:
+        render_overlay(st.session_state.conn)
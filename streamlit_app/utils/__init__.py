@@ -0,0 +1,3 @@
+"""
+Shared data-access helpers used by the Streamlit pages
+"""
@@ -0,0 +1,82 @@
+"""
+Arrow Results - Fetch query results as Arrow and keep native column types
+
+Snowflake sends results as Arrow. Reading them with fetch_arrow_all /
+fetch_arrow_batches avoids building Python row tuples, and NUMBER columns
+arriving as Decimal are cast to int64 (scale 0) or float64 while still in
+Arrow, so pages never see object-dtype Decimal columns and need no
+.astype(float) before arithmetic or charting. Arrow tables can be passed
+straight to st.dataframe.
+
+Snowflake types SUM and COUNT results as NUMBER(38,0) whatever their values,
+so a scale-0 column becomes int64 whenever its values fit, not only when its
+declared precision does.
+"""
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Rows per Arrow batch requested from cursors that let us choose
+BATCH_ROWS = 10_000
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def _fits_int64(column):
+    bounds = pc.min_max(column)
+    low, high = bounds["min"].as_py(), bounds["max"].as_py()
+    # An all-null column has no bounds
+    return low is None or (INT64_MIN <= low and high <= INT64_MAX)
+
+
+def _target(field, column):
+    if field.type.scale == 0 and (field.type.precision <= 18 or _fits_int64(column)):
+        return pa.int64()
+    return pa.float64()
+
+
+def compact(table):
+    """Cast Decimal columns to int64 or float64; other columns are untouched."""
+    fields = []
+    changed = False
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_decimal(field.type):
+            fields.append(pa.field(field.name, _target(field, column), field.nullable))
+            changed = True
+        else:
+            fields.append(field)
+    if not changed:
+        return table
+    columns = [
+        pc.cast(column, field.type, safe=False) if column.type != field.type else column
+        for column, field in zip(table.columns, fields)
+    ]
+    return pa.Table.from_arrays(columns, schema=pa.schema(fields))
+
+
+def to_frame(table, owned=False):
+    """Convert an Arrow table to pandas with compact native dtypes.
+
+    Pass owned=True when nothing else references the table; its buffers are
+    then released column by column during conversion, roughly halving peak
+    memory for large results.
+    """
+    table = compact(table)
+    if owned:
+        return table.to_pandas(self_destruct=True, split_blocks=True, date_as_object=False)
+    return table.to_pandas(date_as_object=False)
+
+
+def arrow_batches(cursor):
+    """Iterator of Arrow tables/batches from an executed cursor, or None."""
+    if hasattr(cursor, "fetch_arrow_batches"):
+        # Snowflake: one table per result chunk sent by the server
+        try:
+            return cursor.fetch_arrow_batches()
+        except Exception:
+            # Results in JSON format (e.g. some CALL results) have no Arrow path
+            return None
+    if hasattr(cursor, "to_arrow_reader"):
+        # DuckDB (local warehouse)
+        return iter(cursor.to_arrow_reader(BATCH_ROWS))
+    return None
@@ -0,0 +1,78 @@
+"""
+Batch Loader - Run a page's data loaders concurrently
+
+Each page submits all of its loaders at once and waits for them together, so
+page latency is the slowest query instead of the sum of all of them. Loaders
+keep their own caching; cached calls simply return immediately.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Shared across sessions to cap concurrent warehouse queries per process
+MAX_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="page-loader")
+
+_prefetches = set()
+_prefetches_lock = threading.Lock()
+
+
+def _run_with_context(ctx, func, args):
+    """Run a loader on a worker thread attached to the caller's script run."""
+    # Worker threads are reused across sessions, so re-attach on every task
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return func(*args)
+
+
+def load_all(loaders):
+    """Run loaders concurrently and return their results keyed by name.
+
+    loaders maps a name to a (func, *args) tuple. All loaders run to
+    completion; if any failed, the first failure in submission order is
+    re-raised.
+    """
+    ctx = get_script_run_ctx()
+    futures = {
+        name: _executor.submit(_run_with_context, ctx, func, args)
+        for name, (func, *args) in loaders.items()
+    }
+
+    results = {}
+    first_error = None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            if first_error is None:
+                first_error = e
+    if first_error is not None:
+        raise first_error
+    return results
+
+
+def prefetch(func, *args):
+    """Start func(*args) in the background without waiting for it.
+
+    Used to warm a cache ahead of the user (e.g. the next page of a table);
+    failures are ignored since the real request will simply run again.
+    """
+    future = _executor.submit(_run_with_context, get_script_run_ctx(), func, args)
+    with _prefetches_lock:
+        _prefetches.add(future)
+    future.add_done_callback(_prefetch_done)
+    return future
+
+
+def _prefetch_done(future):
+    with _prefetches_lock:
+        _prefetches.discard(future)
+    future.exception()
+
+
+def wait_for_prefetches(timeout=None):
+    """Block until the prefetches started so far have finished."""
+    with _prefetches_lock:
+        pending = list(_prefetches)
+    wait(pending, timeout)
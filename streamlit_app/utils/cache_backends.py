@@ -0,0 +1,190 @@
+"""
+Cache Backends - Pluggable storage for cached query results
+
+MemoryBackend keeps frames in this process and is the default; it needs
+nothing beyond pandas and is what offline runs use. ArrowDirectoryBackend
+writes each frame as an Arrow IPC file in a shared directory, so every
+Streamlit replica mounting that directory sees the same warm results and a
+restart does not start cold. Files are memory-mapped on read and the directory
+is kept under a byte budget by evicting the least recently used files.
+
+Set SALES_CACHE_DIR (and optionally SALES_CACHE_MAX_MB) to enable the shared
+directory backend.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+
+from utils.arrow_results import to_frame
+
+# Safety net only; entries are normally invalidated by data version
+TTL_SECONDS = 3600
+
+# Upper bound on cached frames held in memory per process
+MAX_ENTRIES = 2000
+
+DEFAULT_MAX_MB = 512
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU store of frames tagged with a data version."""
+
+    def __init__(self, ttl_seconds=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            frame, entry_version, stored_at = entry
+            if entry_version != version or time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return frame
+
+    def put(self, key, frame, version):
+        with self._lock:
+            self._entries[key] = (frame, version, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ArrowDirectoryBackend:
+    """Arrow IPC files in a directory shared between replicas, LRU by size."""
+
+    SUFFIX = ".arrow"
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, ttl_seconds=TTL_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + self.SUFFIX)
+
+    def get(self, key, version):
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        stored_version = metadata.get(b"data_version", b"").decode()
+        stored_at = float(metadata.get(b"stored_at", b"0"))
+        if stored_version != json.dumps(version, default=str) or time.time() - stored_at > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        # Bump mtime so LRU eviction sees this file as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return to_frame(table)
+
+    def put(self, key, frame, version):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b"data_version": json.dumps(version, default=str).encode(),
+            b"stored_at": str(time.time()).encode(),
+        })
+        # Write then rename so other replicas never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def clear(self):
+        for path in self._files():
+            self._remove(path)
+
+    def _files(self):
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(self.SUFFIX)
+        ]
+
+    def _evict(self):
+        """Delete least recently used files until under the byte budget."""
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def private_cache_dir():
+    """SALES_CACHE_DIR if set, else a cache directory only this user can access.
+
+    The system temp directory is world-writable, and the files kept here
+    (generated SQL, the warm query registry) are trusted when read back.
+    """
+    directory = os.environ.get("SALES_CACHE_DIR")
+    if directory:
+        return directory
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    directory = os.path.join(base, "sales_analytics")
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.stat(directory)
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{directory} is owned by another user")
+        if info.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+        return directory
+    except OSError:
+        # No usable home directory: a fresh private directory for this process
+        return tempfile.mkdtemp(prefix="sales_analytics_")
+
+
+def backend_from_env():
+    """Build the backend selected by SALES_CACHE_DIR / SALES_CACHE_MAX_MB."""
+    directory = os.environ.get("SALES_CACHE_DIR")
+    if not directory:
+        return MemoryBackend()
+    max_mb = int(os.environ.get("SALES_CACHE_MAX_MB", DEFAULT_MAX_MB))
+    return ArrowDirectoryBackend(directory, max_bytes=max_mb * 1024 * 1024)
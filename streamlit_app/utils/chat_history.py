@@ -0,0 +1,152 @@
+"""
+Chat History - Compact storage for past Ask Cortex answers
+
+Only the latest answer keeps its live ResultPager. When a new answer arrives,
+older ones are compacted: the rows fetched so far are spilled to an Arrow IPC
+file in a per-session temp directory and the history entry keeps just the SQL,
+a small preview and the file reference. The full result is memory-mapped back
+only when the user asks to see it, and only the most recent results are kept
+at all, so a long session neither grows memory nor slows every rerun.
+
+The spill directory is removed when its session ends (its session state is
+garbage collected) or by "Clear Chat". Directories left behind by a process
+that did not exit cleanly are swept when the next process first spills.
+"""
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from dataclasses import dataclass
+
+import pandas as pd
+import pyarrow as pa
+
+# Rows kept in memory for an old answer
+PREVIEW_ROWS = 20
+
+# Older answers lose their result entirely (the SQL is still shown)
+MAX_RETAINED_RESULTS = 10
+
+SPILL_PREFIX = "sales_analyst_"
+
+# Spill directories untouched for this long belong to no live session
+STALE_SPILL_SECONDS = 24 * 3600
+
+_swept = False
+_sweep_lock = threading.Lock()
+
+
+@dataclass
+class StoredResult:
+    """A spilled answer: preview in memory, full rows on disk."""
+    path: str
+    rows: int
+    preview: pd.DataFrame
+
+    @property
+    def has_more(self):
+        return self.rows > len(self.preview)
+
+    def load(self):
+        """Memory-map the full result back as an Arrow table."""
+        try:
+            # The table's buffers keep the mapping alive; the file handle is closed
+            with pa.memory_map(self.path) as source:
+                return pa.ipc.open_file(source).read_all()
+        except FileNotFoundError:
+            # Temp files can be cleaned up under a long-lived session
+            return self.preview
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SpillDirectory:
+    """Temp directory deleted once nothing references this object."""
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix=SPILL_PREFIX)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def remove(self):
+        self._finalizer()
+
+
+def sweep_stale(max_age=STALE_SPILL_SECONDS):
+    """Delete this user's spill directories not modified within max_age seconds."""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{SPILL_PREFIX}*")):
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        if info.st_uid == os.getuid() and info.st_mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _sweep_once():
+    global _swept
+    with _sweep_lock:
+        if not _swept:
+            _swept = True
+            sweep_stale()
+
+
+def spill_directory(session_state):
+    """Per-session directory for spilled results, created on first use.
+
+    It lives in session state, so it is deleted when the session is.
+    """
+    directory = session_state.get("analyst_spill_dir")
+    if directory is None or not os.path.isdir(directory.path):
+        _sweep_once()
+        directory = SpillDirectory()
+        session_state["analyst_spill_dir"] = directory
+    return directory.path
+
+
+def spill(table, directory):
+    """Write an Arrow table to a file and return its StoredResult."""
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.arrow")
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # to_pandas copies, so the preview does not pin the full table in memory
+    preview = table.slice(0, PREVIEW_ROWS).to_pandas()
+    return StoredResult(path=path, rows=table.num_rows, preview=preview)
+
+
+def _release(message):
+    pager = message.pop("pager", None)
+    if pager is not None:
+        pager.close()
+    result = message.get("result")
+    if result is not None:
+        result.discard()
+    message["result"] = None
+
+
+def compact(messages, directory, keep=MAX_RETAINED_RESULTS):
+    """Spill every live pager but the latest and drop results beyond keep."""
+    answers = [m for m in messages if "pager" in m or m.get("result") is not None]
+    for age, message in enumerate(reversed(answers)):
+        if age >= keep:
+            _release(message)
+        elif age > 0 and "pager" in message:
+            pager = message.pop("pager")
+            pager.close()
+            message["result"] = spill(pager.table, directory)
+
+
+def clear(messages):
+    """Delete every spilled file referenced by the history."""
+    for message in messages:
+        if "pager" in message or message.get("result") is not None:
+            _release(message)
@@ -0,0 +1,256 @@
+"""
+Connection Pool - A bounded set of Snowflake sessions shared by all users
+
+One st.connection is one Snowflake session, so every loader thread of every
+user session used to queue on it, and a session dropped by Snowflake (expired
+token, network blip) stayed broken until the app restarted. The pool keeps up
+to POOL_SIZE sessions, hands one to each statement, checks a session's health
+before reusing it after an idle spell and reconnects transparently when the
+session has expired. Sessions use the connector's client_session_keep_alive
+heartbeat so idle members are not logged out, and MIN_IDLE of them are opened
+at start-up so the first users do not pay for the login.
+
+The pool has the same query() / cursor() surface as st.connection, so pages
+and utils use it unchanged. stats() reports the numbers shown in the
+performance overlay.
+"""
+import os
+import threading
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+
+from streamlit.connections import SnowflakeConnection
+
+# Upper bound on open sessions; matches the loader concurrency (utils.batch_loader)
+POOL_SIZE = int(os.environ.get("SALES_POOL_SIZE", 8))
+
+# Sessions opened eagerly so the first page loads find one ready
+MIN_IDLE = int(os.environ.get("SALES_POOL_MIN_IDLE", 2))
+
+# A session idle for longer than this is probed with SELECT 1 before reuse
+HEALTH_CHECK_AFTER = 60
+
+# How long a statement waits for a free session before giving up
+CHECKOUT_TIMEOUT = 30
+
+# Snowflake error numbers for sessions and tokens that are no longer valid
+SESSION_EXPIRED_ERRNOS = {390111, 390112, 390114}
+
+
+@dataclass
+class PoolStats:
+    """Counters describing pool usage since start-up."""
+    size: int
+    open: int = 0
+    in_use: int = 0
+    peak_in_use: int = 0
+    checkouts: int = 0
+    waits: int = 0
+    wait_ms: float = 0.0
+    health_checks: int = 0
+    reconnects: int = 0
+    timeouts: int = 0
+
+
+class _Member:
+    """One pooled session and when it was last known to be healthy."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.checked_at = time.monotonic()
+
+
+def _session_expired(error):
+    return getattr(error, "errno", None) in SESSION_EXPIRED_ERRNOS
+
+
+class ConnectionPool:
+    """Bounded pool of Snowflake connections created by factory()."""
+
+    def __init__(self, factory, size=POOL_SIZE, min_idle=MIN_IDLE):
+        self._factory = factory
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self._stats = PoolStats(size=size)
+        self.size = size
+        # Opening sessions up front also surfaces bad configuration immediately
+        for _ in range(min(min_idle, size)):
+            self._open += 1
+            self._idle.append(self._connect())
+        self._stats.open = self._open
+
+    def _connect(self):
+        conn = self._factory()
+        conn.raw_connection  # log in now rather than on first use
+        return _Member(conn)
+
+    def _healthy(self, member):
+        raw = member.conn.raw_connection
+        if raw.is_closed():
+            return False
+        if time.monotonic() - member.checked_at < HEALTH_CHECK_AFTER:
+            return True
+        with self._condition:
+            self._stats.health_checks += 1
+        try:
+            with closing(raw.cursor()) as cursor:
+                cursor.execute("SELECT 1").fetchall()
+        except Exception:
+            return False
+        return True
+
+    def _reconnect(self, member):
+        # reset() only forgets the raw connection; log its session out first
+        try:
+            member.conn.raw_connection.close()
+        except Exception:
+            pass
+        member.conn.reset()
+        member.conn.raw_connection
+        member.checked_at = time.monotonic()
+        with self._condition:
+            self._stats.reconnects += 1
+
+    def _acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while not self._idle and self._open >= self.size:
+                waited = True
+                remaining = CHECKOUT_TIMEOUT - (time.monotonic() - started)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    self._stats.timeouts += 1
+                    raise TimeoutError(f"No Snowflake connection free after {CHECKOUT_TIMEOUT}s")
+            member = self._idle.pop() if self._idle else None
+            if member is None:
+                # Reserve the slot before connecting outside the lock
+                self._open += 1
+            stats = self._stats
+            stats.checkouts += 1
+            stats.in_use += 1
+            stats.peak_in_use = max(stats.peak_in_use, stats.in_use)
+            if waited:
+                stats.waits += 1
+                stats.wait_ms += (time.monotonic() - started) * 1000
+
+        try:
+            if member is None:
+                member = self._connect()
+                with self._condition:
+                    self._stats.open = self._open
+            elif not self._healthy(member):
+                self._reconnect(member)
+        except Exception:
+            self._discard(member)
+            raise
+        return member
+
+    def _release(self, member):
+        member.checked_at = time.monotonic()
+        with self._condition:
+            self._idle.append(member)
+            self._stats.in_use -= 1
+            self._condition.notify()
+
+    def _discard(self, member):
+        """Give up a slot whose session could not be opened or repaired."""
+        if member is not None:
+            try:
+                member.conn.close()
+            except Exception:
+                pass
+        with self._condition:
+            self._open -= 1
+            self._stats.open = self._open
+            self._stats.in_use -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a healthy connection for the duration of the block."""
+        member = self._acquire()
+        try:
+            yield member
+        finally:
+            self._release(member)
+
+    def query(self, sql, ttl=None, params=None, show_spinner=None, **kwargs):
+        """Like st.connection().query(), run on a pooled session.
+
+        Cached results are kept per session, as with st.connection.
+        """
+        with self.checkout() as member:
+            try:
+                return member.conn.query(sql, ttl=ttl, params=params, show_spinner=show_spinner, **kwargs)
+            except Exception as error:
+                if not _session_expired(error):
+                    raise
+                self._reconnect(member)
+                return member.conn.query(sql, ttl=ttl, params=params, show_spinner=show_spinner, **kwargs)
+
+    def cursor(self):
+        """A cursor that holds a pooled session only while it executes."""
+        return PooledCursor(self)
+
+    def stats(self):
+        """A snapshot of the pool counters."""
+        with self._condition:
+            return PoolStats(**vars(self._stats))
+
+
+class PooledCursor:
+    """Snowflake cursor that returns its session to the pool after execute().
+
+    Results are fetched from the result chunks Snowflake has already
+    produced, so paging through them (utils.result_guard) does not tie up a
+    session. Attributes other than execute and close go to the real cursor.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._member = None
+        self._member = pool._acquire()
+        self._cursor = self._member.conn.cursor()
+
+    def execute(self, sql, params=None, **kwargs):
+        try:
+            try:
+                self._cursor.execute(sql, params, **kwargs)
+            except Exception as error:
+                if self._member is None or not _session_expired(error):
+                    raise
+                self._pool._reconnect(self._member)
+                self._cursor = self._member.conn.cursor()
+                self._cursor.execute(sql, params, **kwargs)
+        finally:
+            self._release()
+        return self
+
+    def _release(self):
+        if self._member is not None:
+            member, self._member = self._member, None
+            self._pool._release(member)
+
+    def close(self):
+        self._release()
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._cursor, name)
+
+    def __del__(self):
+        # Cursors dropped without execute() or close() must not leak a slot
+        if getattr(self, "_member", None) is not None:
+            self._release()
+
+
+def snowflake_pool():
+    """ConnectionPool of qmark Snowflake connections from the app's secrets."""
+    def factory():
+        # qmark binds are sent to the server, so statement text stays constant
+        return SnowflakeConnection("snowflake", paramstyle="qmark", client_session_keep_alive=True)
+    return ConnectionPool(factory)
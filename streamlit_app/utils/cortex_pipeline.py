@@ -0,0 +1,65 @@
+"""
+Cortex Pipeline - Generate and run Cortex SQL in a single round trip
+
+SEMANTIC.ANSWER_QUESTION (see snowflake_setup.sql) calls COMPLETE, strips the
+markdown fences, runs the generated SQL and returns its rows with the SQL in a
+leading GENERATED_SQL column, all server-side. Results are read back from the
+cursor a page at a time (see utils.result_guard), so the first rows render
+without waiting for the whole result.
+"""
+from utils.instrumentation import statement
+from utils.result_guard import MAX_ROWS, PREVIEW_ROWS, ResultPager, inject_limit
+
+ANSWER_PROCEDURE = "SALES_ANALYTICS_DB.SEMANTIC.ANSWER_QUESTION"
+
+MODEL = "mistral-large2"
+
+SQL_COLUMN = "GENERATED_SQL"
+
+
+def clean_sql(text):
+    """Strip markdown fences and whitespace from COMPLETE output."""
+    return text.strip().replace("```sql", "").replace("```", "").strip()
+
+
+def generate_sql(conn, prompt_text):
+    """Ask COMPLETE for SQL only (the two round trip path)."""
+    with statement("cortex_complete") as event:
+        response = conn.query(f"""
+            SELECT SNOWFLAKE.CORTEX.COMPLETE(
+                '{MODEL}',
+                ?
+            ) as SQL_QUERY
+        """, params=[prompt_text])
+        event.rows = len(response)
+    return clean_sql(response['SQL_QUERY'].iloc[0])
+
+
+def run_sql(conn, sql, max_rows=MAX_ROWS):
+    """Run SQL under a row cap and return (executed_sql, pager) with a preview loaded."""
+    guarded_sql = inject_limit(sql, max_rows)
+    with statement("cortex_run_sql") as event:
+        cursor = conn.cursor()
+        cursor.execute(guarded_sql)
+        event.query_id = getattr(cursor, "sfqid", None)
+        pager = ResultPager(cursor)
+        event.rows = pager.fetch_page(PREVIEW_ROWS)
+    return guarded_sql, pager
+
+
+def answer(conn, prompt_text, max_rows=MAX_ROWS):
+    """Generate and run SQL server-side, returning (generated_sql, pager).
+
+    The pager already holds the preview rows; later pages are fetched from
+    the same cursor on demand.
+    """
+    with statement("cortex_answer") as event:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"CALL {ANSWER_PROCEDURE}(?, ?)",
+            [prompt_text, int(max_rows)],
+        )
+        event.query_id = getattr(cursor, "sfqid", None)
+        pager = ResultPager(cursor, sql_column=SQL_COLUMN)
+        event.rows = pager.fetch_page(PREVIEW_ROWS)
+    return pager.generated_sql, pager
@@ -0,0 +1,66 @@
+"""
+Freshness - Tag cached results with the Dynamic Table data they were built from
+
+Each cached result records the last data timestamp of the Dynamic Tables it
+read. A cheap metadata probe of DYNAMIC_TABLE_REFRESH_HISTORY tells us when a
+table has actually changed, so only entries built from that table are
+invalidated; refreshes that found no new data leave every entry in place.
+"""
+import time
+from datetime import timedelta
+
+import streamlit as st
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+# How often the refresh history is re-read; well under the 5 minute target lag
+PROBE_INTERVAL = timedelta(seconds=60)
+
+# Used when refresh history is unavailable (e.g. missing MONITOR privilege)
+FALLBACK_BUCKET_SECONDS = 300
+
+
+@st.cache_data(ttl=PROBE_INTERVAL, show_spinner=False)
+def _probe_refresh_state(_conn):
+    """Last data timestamp of each MARTS Dynamic Table refresh that changed data."""
+    query = f"""
+    SELECT
+        NAME,
+        MAX(DATA_TIMESTAMP) as DATA_TIMESTAMP
+    FROM TABLE({DATABASE}.INFORMATION_SCHEMA.DYNAMIC_TABLE_REFRESH_HISTORY(
+        NAME_PREFIX => '{DATABASE}.MARTS.',
+        RESULT_LIMIT => 10000
+    ))
+    WHERE STATE = 'SUCCEEDED'
+      AND REFRESH_ACTION <> 'NO_DATA'
+    GROUP BY NAME
+    """
+    try:
+        frame = _conn.query(query, ttl=0, show_spinner=False)
+    except Exception:
+        # Cached like a success so a missing privilege is not retried per query
+        return None
+    return {row.NAME: str(row.DATA_TIMESTAMP) for row in frame.itertuples()}
+
+
+def refresh_state(conn):
+    """Return {table: last data timestamp}, or None if the probe failed."""
+    return _probe_refresh_state(conn)
+
+
+def data_version(conn, tables):
+    """Version tag for results built from the given MARTS tables.
+
+    The tag only changes when one of the tables has refreshed with new data.
+    Without refresh history it falls back to a fixed time bucket, which
+    matches the old five minute TTL behaviour.
+    """
+    state = refresh_state(conn)
+    if state is None:
+        return ("bucket", int(time.time() // FALLBACK_BUCKET_SECONDS))
+    return tuple((table, state.get(table)) for table in sorted(tables))
+
+
+def recheck():
+    """Force the next data_version call to re-read refresh history."""
+    _probe_refresh_state.clear()
@@ -0,0 +1,233 @@
+"""
+Instrumentation - Timing, row counts and query IDs for every data call
+
+Page loaders are wrapped with @instrumented and warehouse statements run
+through execute() or statement(), so each interaction records which loader
+ran, whether the result cache served it, how long it took, how many rows came
+back and the Snowflake query ID. Queue time, execution time and bytes scanned
+are looked up by query ID from QUERY_HISTORY_BY_USER when the overlay is
+shown; statements run on whichever pooled session was free, so the history of
+the overlay's own session would miss most of them.
+
+Events are kept in session state for the sidebar overlay, written as JSON
+lines to the "sales_analytics.perf" logger (and to SALES_PERF_LOG if set), and
+emitted as OpenTelemetry spans when opentelemetry is installed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import closing, contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.arrow_results import to_frame
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("sales_analytics")
+except ImportError:  # spans are optional
+    _tracer = None
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+EVENTS_KEY = "perf_events"
+RUN_KEY = "perf_run"
+PAGE_KEY = "perf_page"
+
+# Events kept per session for the overlay
+MAX_EVENTS = 500
+
+logger = logging.getLogger("sales_analytics.perf")
+if os.environ.get("SALES_PERF_LOG"):
+    _handler = logging.FileHandler(os.environ["SALES_PERF_LOG"])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()
+
+
+@dataclass
+class Event:
+    """One timed loader call or warehouse statement."""
+    kind: str                   # "loader" or "statement"
+    name: str
+    page: str = None
+    loader: str = None
+    run: int = None
+    wall_ms: float = None
+    rows: int = None
+    cache: str = None           # "hit", "partial" or "miss" (loaders only)
+    query_id: str = None
+    queued_ms: float = None
+    execution_ms: float = None
+    bytes_scanned: int = None
+    error: str = None
+    started_at: float = field(default_factory=time.time)
+
+
+def _session():
+    """Session state when called from a script run (including loader threads)."""
+    return st.session_state if get_script_run_ctx() is not None else None
+
+
+def start_run(page):
+    """Mark the start of a script run for the given page."""
+    session = _session()
+    if session is not None:
+        session[RUN_KEY] = session.get(RUN_KEY, 0) + 1
+        session[PAGE_KEY] = page
+
+
+def _new_event(kind, name):
+    session = _session()
+    loader = getattr(_local, "loader", None)
+    return Event(
+        kind=kind,
+        name=name,
+        page=session.get(PAGE_KEY) if session is not None else None,
+        loader=loader.name if loader is not None else None,
+        run=session.get(RUN_KEY) if session is not None else None,
+    )
+
+
+def _record(event):
+    session = _session()
+    if session is not None:
+        events = session.setdefault(EVENTS_KEY, [])
+        events.append(event)
+        del events[:-MAX_EVENTS]
+    logger.info(json.dumps(asdict(event), default=str))
+
+
+@contextmanager
+def _span(event):
+    otel = _tracer.start_as_current_span(event.name) if _tracer is not None else None
+    span = otel.__enter__() if otel is not None else None
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as error:
+        event.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        event.wall_ms = round((time.perf_counter() - started) * 1000, 1)
+        if span is not None:
+            for key, value in asdict(event).items():
+                if value is not None:
+                    span.set_attribute(f"sales.{key}", value)
+            otel.__exit__(None, None, None)
+        _record(event)
+
+
+def instrumented(func):
+    """Time a page data function and tag the statements it issues."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        event = _new_event("loader", func.__name__)
+        previous = getattr(_local, "loader", None)
+        _local.loader = event
+        try:
+            with _span(event):
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    event.rows = len(result)
+                return result
+        finally:
+            _local.loader = previous
+    return wrapper
+
+
+def note_cache(status):
+    """Record the result-cache outcome for the loader running on this thread."""
+    loader = getattr(_local, "loader", None)
+    if loader is not None:
+        loader.cache = status
+
+
+@contextmanager
+def statement(name):
+    """Time one warehouse statement; set rows/query_id on the yielded event."""
+    with _span(_new_event("statement", name)) as event:
+        yield event
+
+
+def execute(conn, sql, params=None, name="query"):
+    """Run SQL uncached and return a DataFrame, recording the statement."""
+    with statement(name) as event:
+        if hasattr(conn, "raw_connection") or hasattr(conn, "checkout"):
+            # Snowflake (st.connection or utils.connection_pool): like
+            # conn.query(), but keeps the cursor to read its query ID and
+            # converts the Arrow result itself (see utils.arrow_results)
+            with closing(conn.cursor()) as cursor:
+                cursor.execute(sql, params)
+                event.query_id = cursor.sfqid
+                frame = to_frame(cursor.fetch_arrow_all(force_return_table=True), owned=True)
+        else:
+            frame = conn.query(sql, params=params, ttl=0)
+        event.rows = len(frame)
+        return frame
+
+
+def enrich(conn, events):
+    """Fill queue time, execution time and bytes scanned from query history."""
+    pending = {e.query_id: e for e in events if e.query_id and e.execution_ms is None}
+    if not pending:
+        return
+    placeholders = ", ".join("?" for _ in pending)
+    try:
+        history = conn.query(f"""
+            SELECT
+                QUERY_ID,
+                QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME AS QUEUED_MS,
+                EXECUTION_TIME AS EXECUTION_MS,
+                BYTES_SCANNED
+            FROM TABLE({DATABASE}.INFORMATION_SCHEMA.QUERY_HISTORY_BY_USER(RESULT_LIMIT => 1000))
+            WHERE QUERY_ID IN ({placeholders})
+        """, params=list(pending), ttl=0, show_spinner=False)
+    except Exception:
+        # History is best effort; entries can lag the query by a few seconds
+        return
+    for row in history.itertuples():
+        event = pending[row.QUERY_ID]
+        event.queued_ms = row.QUEUED_MS
+        event.execution_ms = row.EXECUTION_MS
+        event.bytes_scanned = row.BYTES_SCANNED
+
+
+def render_overlay(conn):
+    """Sidebar summary of the loaders and statements of the latest run."""
+    session = st.session_state
+    events = [e for e in session.get(EVENTS_KEY, []) if e.run == session.get(RUN_KEY)]
+    enrich(conn, events)
+    statements = [e for e in events if e.kind == "statement"]
+    loaders = [e for e in events if e.kind == "loader"]
+    hits = sum(e.cache == "hit" for e in loaders)
+
+    st.markdown("**Performance**")
+    st.caption(
+        f"{len(loaders)} loaders ({hits} cached), {len(statements)} warehouse queries, "
+        f"{sum(e.rows or 0 for e in statements):,} rows, "
+        f"{sum(e.bytes_scanned or 0 for e in statements) / 1e6:,.1f} MB scanned"
+    )
+    if hasattr(conn, "stats"):
+        pool = conn.stats()
+        st.caption(
+            f"Connection pool: {pool.in_use}/{pool.open} in use (max {pool.size}, peak {pool.peak_in_use}), "
+            f"{pool.waits:,} of {pool.checkouts:,} checkouts waited ({pool.wait_ms:,.0f} ms), "
+            f"{pool.reconnects} reconnects, {pool.timeouts} timeouts"
+        )
+    if events:
+        columns = ["kind", "name", "loader", "wall_ms", "rows", "cache",
+                   "queued_ms", "execution_ms", "bytes_scanned", "query_id", "error"]
+        st.dataframe(
+            pd.DataFrame([asdict(e) for e in events])[columns],
+            hide_index=True,
+            use_container_width=True,
+        )
@@ -0,0 +1,84 @@
+"""
+KPI Snapshot - Executive KPIs for the standard date presets, precomputed
+
+MARTS.KPI_SNAPSHOT (see snowflake_setup.sql) holds one row per sidebar preset
+(30D, 90D, 1Y, MTD, QTD, YTD) with the preset's dates and its KPIs, including
+an exact distinct customer count. When the selected range is exactly a preset
+the dashboard reads that row instead of scanning FCT_ORDERS. The row is only
+used when its dates match the request, so a snapshot that has not refreshed
+since midnight falls back to the regular query rather than serving stale dates.
+The snapshot refreshes hourly (a full recompute), so its KPIs can trail the
+other marts by up to an hour.
+"""
+from datetime import date, timedelta
+
+from utils.freshness import data_version
+from utils.instrumentation import execute, note_cache
+from utils.range_cache import get_range_cache
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+TABLE = "KPI_SNAPSHOT"
+
+KPI_COLUMNS = [
+    "TOTAL_REVENUE",
+    "GROSS_REVENUE",
+    "TOTAL_DISCOUNTS",
+    "ORDER_COUNT",
+    "CUSTOMER_COUNT",
+    "UNITS_SOLD",
+    "AVG_ORDER_VALUE",
+]
+
+# Rolling presets in days; the to-date presets start at a period boundary
+ROLLING_PRESETS = {"30D": 30, "90D": 90, "1Y": 365}
+TO_DATE_PRESETS = ("MTD", "QTD", "YTD")
+
+
+def preset_range(preset, today=None):
+    """(start, end) of a preset ending today, matching KPI_SNAPSHOT's dates."""
+    today = today or date.today()
+    if preset in ROLLING_PRESETS:
+        return today - timedelta(days=ROLLING_PRESETS[preset]), today
+    if preset == "MTD":
+        return today.replace(day=1), today
+    if preset == "QTD":
+        return today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1), today
+    if preset == "YTD":
+        return today.replace(month=1, day=1), today
+    raise ValueError(f"Unknown preset {preset!r}")
+
+
+def match_preset(start_date, end_date, today=None):
+    """Name of the preset covering exactly start_date..end_date, or None."""
+    for preset in (*ROLLING_PRESETS, *TO_DATE_PRESETS):
+        if preset_range(preset, today) == (start_date, end_date):
+            return preset
+    return None
+
+
+def snapshot_kpis(conn, start_date, end_date):
+    """KPIs for a preset range from KPI_SNAPSHOT, or None if not servable."""
+    preset = match_preset(start_date, end_date)
+    if preset is None:
+        return None
+    cache = get_range_cache()
+    key = ("kpi_snapshot", preset, start_date, end_date)
+    version = data_version(conn, {TABLE})
+    frame = cache.get(key, version)
+    note_cache("miss" if frame is None else "hit")
+    if frame is None:
+        try:
+            frame = execute(conn, f"""
+                SELECT {', '.join(KPI_COLUMNS)}
+                FROM {DATABASE}.MARTS.{TABLE}
+                WHERE PRESET = ? AND START_DATE = ? AND END_DATE = ?
+            """, [preset, start_date, end_date], name=TABLE)
+        except Exception:
+            # Table not deployed yet; the fact table still answers
+            return None
+        if frame.empty:
+            # Snapshot still on yesterday's dates; let the caller query directly
+            return None
+        cache.put(key, frame, version)
+    return frame.copy()
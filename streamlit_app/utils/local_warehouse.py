@@ -0,0 +1,388 @@
+"""
+Local Warehouse - DuckDB stand-in for Snowflake in offline runs
+
+Builds SALES_ANALYTICS_DB with the same RAW tables, STAGING views and MARTS
+tables as snowflake_setup.sql inside an embedded DuckDB database, seeded by a
+vectorized synthetic generator that follows the same distributions as the
+setup script's GENERATOR inserts. Orders are generated in chunks, so tens of
+millions of rows fit comfortably on a laptop.
+
+LocalConnection accepts the subset of the st.connection("snowflake") API the
+app uses (query() and cursor()), so pages, the query router and the caches run
+unchanged. Dynamic Tables are plain tables here; refresh history and Cortex
+functions are unavailable, and the code paths that use them fall back as they
+would without the privilege.
+
+Select it with SALES_WAREHOUSE=local (or sales_warehouse = "local" in
+secrets.toml). SALES_LOCAL_ORDERS sets the number of orders and
+SALES_LOCAL_DB a database file to keep the generated data between runs.
+"""
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.arrow_results import to_frame
+
+try:
+    import duckdb
+except ImportError:  # only needed for offline runs
+    duckdb = None
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+DEFAULT_ORDERS = 100_000
+
+# Orders generated per batch; bounds generator memory at any scale
+CHUNK_ROWS = 2_000_000
+
+CUSTOMERS = 10_000
+PRODUCTS = 500
+SALES_REPS = 50
+ORDER_DAYS = 730
+
+INDUSTRIES = ["Technology", "Healthcare", "Finance", "Retail", "Manufacturing",
+              "Education", "Government", "Media", "Energy", "Transportation"]
+CATEGORIES = ["ELECTRONICS", "CLOTHING", "HOME", "SPORTS", "BOOKS",
+              "TOYS", "BEAUTY", "FOOD", "AUTOMOTIVE", "OFFICE"]
+REGIONS = ["North", "South", "East", "West"]
+
+STAGING_VIEWS = {
+    "STG_CUSTOMERS": """
+        SELECT
+            CUSTOMER_ID, CUSTOMER_NAME, SEGMENT, INDUSTRY, CREATED_AT,
+            NOT (CUSTOMER_ID IS NULL OR CUSTOMER_NAME IS NULL OR SEGMENT IS NULL) AS IS_VALID
+        FROM {db}.RAW.CUSTOMERS""",
+    "STG_PRODUCTS": """
+        SELECT
+            PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY, LIST_PRICE,
+            NOT (PRODUCT_ID IS NULL OR PRODUCT_NAME IS NULL OR CATEGORY IS NULL OR LIST_PRICE <= 0) AS IS_VALID
+        FROM {db}.RAW.PRODUCTS""",
+    "STG_SALES_REPS": """
+        SELECT
+            SALES_REP_ID, REP_NAME, TEAM, REGION, HIRE_DATE,
+            NOT (SALES_REP_ID IS NULL OR REP_NAME IS NULL OR REGION IS NULL) AS IS_VALID
+        FROM {db}.RAW.SALES_REPS""",
+    "STG_ORDERS": """
+        SELECT
+            ORDER_ID, CUSTOMER_ID, PRODUCT_ID, SALES_REP_ID, ORDER_DATE,
+            QUANTITY, UNIT_PRICE, DISCOUNT_PCT,
+            REGION AS ORDER_REGION,
+            QUANTITY * UNIT_PRICE AS GROSS_AMOUNT,
+            QUANTITY * UNIT_PRICE * (1 - COALESCE(DISCOUNT_PCT, 0)) AS NET_AMOUNT,
+            QUANTITY * UNIT_PRICE * COALESCE(DISCOUNT_PCT, 0) AS DISCOUNT_AMOUNT,
+            DATE_TRUNC('week', ORDER_DATE)::DATE AS ORDER_WEEK,
+            DATE_TRUNC('month', ORDER_DATE)::DATE AS ORDER_MONTH,
+            DATE_TRUNC('quarter', ORDER_DATE)::DATE AS ORDER_QUARTER,
+            YEAR(ORDER_DATE) AS ORDER_YEAR,
+            NOT (ORDER_ID IS NULL OR CUSTOMER_ID IS NULL OR PRODUCT_ID IS NULL
+                 OR ORDER_DATE IS NULL OR QUANTITY <= 0 OR UNIT_PRICE <= 0) AS IS_VALID
+        FROM {db}.RAW.ORDERS""",
+}
+
+# DuckDB has no mergeable HLL state, so sketches are emulated with exact
+# distinct lists; the SQL the app sends is the same as on Snowflake
+SKETCH_MACROS = {
+    "HLL_ACCUMULATE(x)": "list(DISTINCT x)",
+    "HLL_COMBINE(s)": "list_distinct(flatten(list(s)))",
+    "HLL_ESTIMATE(s)": "len(s)",
+}
+
+# Built in order; each mirrors the Dynamic Table of the same name
+MART_TABLES = {
+    "FCT_ORDERS": """
+        SELECT
+            o.ORDER_ID, o.ORDER_DATE, o.ORDER_WEEK, o.ORDER_MONTH, o.ORDER_QUARTER, o.ORDER_YEAR,
+            o.CUSTOMER_ID, c.CUSTOMER_NAME, c.SEGMENT AS CUSTOMER_SEGMENT, c.INDUSTRY,
+            o.PRODUCT_ID, p.PRODUCT_NAME, p.CATEGORY, p.SUBCATEGORY, p.LIST_PRICE,
+            o.SALES_REP_ID, r.REP_NAME, r.TEAM, r.REGION AS REP_REGION,
+            o.ORDER_REGION, o.QUANTITY, o.UNIT_PRICE, o.DISCOUNT_PCT,
+            o.GROSS_AMOUNT, o.NET_AMOUNT, o.DISCOUNT_AMOUNT
+        FROM {db}.STAGING.STG_ORDERS o
+        LEFT JOIN {db}.STAGING.STG_CUSTOMERS c ON o.CUSTOMER_ID = c.CUSTOMER_ID
+        LEFT JOIN {db}.STAGING.STG_PRODUCTS p ON o.PRODUCT_ID = p.PRODUCT_ID
+        LEFT JOIN {db}.STAGING.STG_SALES_REPS r ON o.SALES_REP_ID = r.SALES_REP_ID
+        WHERE o.IS_VALID = TRUE""",
+    "DAILY_SALES": """
+        SELECT
+            ORDER_DATE,
+            SUM(REVENUE) AS REVENUE,
+            SUM(GROSS_REVENUE) AS GROSS_REVENUE,
+            SUM(DISCOUNT_TOTAL) AS DISCOUNT_TOTAL,
+            SUM(ORDER_COUNT) AS ORDER_COUNT,
+            COUNT(*) AS CUSTOMER_COUNT,
+            SUM(UNITS_SOLD) AS UNITS_SOLD
+        FROM (
+            SELECT
+                ORDER_DATE, CUSTOMER_ID,
+                SUM(NET_AMOUNT) AS REVENUE,
+                SUM(GROSS_AMOUNT) AS GROSS_REVENUE,
+                SUM(DISCOUNT_AMOUNT) AS DISCOUNT_TOTAL,
+                COUNT(*) AS ORDER_COUNT,
+                SUM(QUANTITY) AS UNITS_SOLD
+            FROM {db}.MARTS.FCT_ORDERS
+            GROUP BY ORDER_DATE, CUSTOMER_ID
+        )
+        GROUP BY ORDER_DATE""",
+    "SALES_BY_REGION": """
+        SELECT
+            ORDER_REGION AS REGION,
+            ORDER_MONTH,
+            SUM(REVENUE) AS REVENUE,
+            SUM(ORDER_COUNT) AS ORDER_COUNT,
+            COUNT(*) AS CUSTOMER_COUNT
+        FROM (
+            SELECT
+                ORDER_REGION, ORDER_MONTH, CUSTOMER_ID,
+                SUM(NET_AMOUNT) AS REVENUE,
+                COUNT(*) AS ORDER_COUNT
+            FROM {db}.MARTS.FCT_ORDERS
+            GROUP BY ORDER_REGION, ORDER_MONTH, CUSTOMER_ID
+        )
+        GROUP BY ORDER_REGION, ORDER_MONTH""",
+    "SALES_BY_PRODUCT": """
+        SELECT
+            PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY,
+            ORDER_MONTH AS MONTH,
+            SUM(NET_AMOUNT) AS REVENUE,
+            COUNT(*) AS ORDER_COUNT,
+            SUM(QUANTITY) AS UNITS_SOLD
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY PRODUCT_ID, PRODUCT_NAME, CATEGORY, SUBCATEGORY, ORDER_MONTH""",
+    "SALES_BY_CUSTOMER": """
+        SELECT
+            CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY,
+            SUM(NET_AMOUNT) AS TOTAL_REVENUE,
+            COUNT(*) AS ORDER_COUNT,
+            MIN(ORDER_DATE) AS FIRST_ORDER_DATE,
+            MAX(ORDER_DATE) AS LAST_ORDER_DATE
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY""",
+    "SALES_BY_CUSTOMER_MONTH": """
+        SELECT
+            CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY,
+            ORDER_MONTH AS MONTH,
+            SUM(NET_AMOUNT) AS REVENUE,
+            COUNT(*) AS ORDER_COUNT,
+            MIN(ORDER_DATE) AS FIRST_ORDER_DATE,
+            MAX(ORDER_DATE) AS LAST_ORDER_DATE
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT, INDUSTRY, ORDER_MONTH""",
+    "SALES_BY_REP": """
+        SELECT
+            SALES_REP_ID, REP_NAME, TEAM,
+            REP_REGION AS REGION,
+            ORDER_MONTH AS MONTH,
+            SUM(REVENUE) AS REVENUE,
+            SUM(ORDER_COUNT) AS ORDER_COUNT,
+            COUNT(*) AS CUSTOMER_COUNT
+        FROM (
+            SELECT
+                SALES_REP_ID, REP_NAME, TEAM, REP_REGION, ORDER_MONTH, CUSTOMER_ID,
+                SUM(NET_AMOUNT) AS REVENUE,
+                COUNT(*) AS ORDER_COUNT
+            FROM {db}.MARTS.FCT_ORDERS
+            GROUP BY SALES_REP_ID, REP_NAME, TEAM, REP_REGION, ORDER_MONTH, CUSTOMER_ID
+        )
+        GROUP BY SALES_REP_ID, REP_NAME, TEAM, REP_REGION, ORDER_MONTH""",
+    "DAILY_CUSTOMER_SKETCH": """
+        SELECT ORDER_DATE, HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY ORDER_DATE""",
+    "REGION_CUSTOMER_SKETCH": """
+        SELECT ORDER_REGION AS REGION, ORDER_MONTH, HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY ORDER_REGION, ORDER_MONTH""",
+    "REP_CUSTOMER_SKETCH": """
+        SELECT SALES_REP_ID, ORDER_MONTH AS MONTH, HLL_ACCUMULATE(CUSTOMER_ID) AS CUSTOMER_HLL
+        FROM {db}.MARTS.FCT_ORDERS
+        GROUP BY SALES_REP_ID, ORDER_MONTH""",
+    "KPI_SNAPSHOT": """
+        WITH PRESETS AS (
+            SELECT '30D' AS PRESET, CURRENT_DATE - 30 AS START_DATE, CURRENT_DATE AS END_DATE
+            UNION ALL SELECT '90D', CURRENT_DATE - 90, CURRENT_DATE
+            UNION ALL SELECT '1Y', CURRENT_DATE - 365, CURRENT_DATE
+            UNION ALL SELECT 'MTD', DATE_TRUNC('month', CURRENT_DATE)::DATE, CURRENT_DATE
+            UNION ALL SELECT 'QTD', DATE_TRUNC('quarter', CURRENT_DATE)::DATE, CURRENT_DATE
+            UNION ALL SELECT 'YTD', DATE_TRUNC('year', CURRENT_DATE)::DATE, CURRENT_DATE
+        )
+        SELECT
+            p.PRESET, p.START_DATE, p.END_DATE,
+            COALESCE(SUM(f.NET_AMOUNT), 0) AS TOTAL_REVENUE,
+            COALESCE(SUM(f.GROSS_AMOUNT), 0) AS GROSS_REVENUE,
+            COALESCE(SUM(f.DISCOUNT_AMOUNT), 0) AS TOTAL_DISCOUNTS,
+            COUNT(f.ORDER_ID) AS ORDER_COUNT,
+            COUNT(DISTINCT f.CUSTOMER_ID) AS CUSTOMER_COUNT,
+            COALESCE(SUM(f.QUANTITY), 0) AS UNITS_SOLD,
+            AVG(f.NET_AMOUNT) AS AVG_ORDER_VALUE
+        FROM PRESETS p
+        LEFT JOIN {db}.MARTS.FCT_ORDERS f ON f.ORDER_DATE BETWEEN p.START_DATE AND p.END_DATE
+        GROUP BY p.PRESET, p.START_DATE, p.END_DATE""",
+}
+
+
+def _padded(prefix, ids, width):
+    return prefix + pd.Series(ids).astype(str).str.zfill(width)
+
+
+def _days_before(end_date, rng, size, days):
+    offsets = rng.integers(0, days, size).astype("timedelta64[D]")
+    return np.datetime64(end_date, "D") - offsets
+
+
+def generate_customers(rng, end_date, count=CUSTOMERS):
+    ids = np.arange(1, count + 1)
+    # Same two independent draws as the setup script's CASE expression
+    segment = np.where(
+        rng.random(count) < 0.1, "Enterprise",
+        np.where(rng.random(count) < 0.4, "SMB", "Consumer"),
+    )
+    return pd.DataFrame({
+        "CUSTOMER_ID": ids,
+        "CUSTOMER_NAME": _padded("Customer_", ids, 5),
+        "SEGMENT": segment,
+        "INDUSTRY": np.array(INDUSTRIES)[rng.integers(0, len(INDUSTRIES), count)],
+        "CREATED_AT": _days_before(end_date, rng, count, 1095).astype("datetime64[us]"),
+    })
+
+
+def generate_products(rng, count=PRODUCTS):
+    ids = np.arange(1, count + 1)
+    return pd.DataFrame({
+        "PRODUCT_ID": ids,
+        "PRODUCT_NAME": _padded("Product_", ids, 4),
+        "CATEGORY": np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), count)],
+        "SUBCATEGORY": "Subcategory_" + pd.Series(rng.integers(1, 6, count)).astype(str),
+        "LIST_PRICE": np.round(10 + rng.random(count) * 4990, 2),
+    })
+
+
+def generate_sales_reps(rng, end_date, count=SALES_REPS):
+    seq = np.arange(count)
+    return pd.DataFrame({
+        "SALES_REP_ID": seq + 1,
+        "REP_NAME": _padded("Rep_", seq + 1, 3),
+        "TEAM": "Team_" + pd.Series(seq % 5 + 1).astype(str),
+        "REGION": np.array(REGIONS)[seq % len(REGIONS)],
+        "HIRE_DATE": _days_before(end_date, rng, count, 1825),
+    })
+
+
+def generate_orders(rng, end_date, first_id, count):
+    """One chunk of orders with ids first_id .. first_id + count - 1."""
+    discounted = rng.random(count) < 0.1
+    return pd.DataFrame({
+        "ORDER_ID": np.arange(first_id, first_id + count),
+        "CUSTOMER_ID": rng.integers(1, CUSTOMERS + 1, count),
+        "PRODUCT_ID": rng.integers(1, PRODUCTS + 1, count),
+        "SALES_REP_ID": rng.integers(1, SALES_REPS + 1, count),
+        "ORDER_DATE": _days_before(end_date, rng, count, ORDER_DAYS),
+        "QUANTITY": rng.integers(1, 11, count),
+        "UNIT_PRICE": np.round(10 + rng.random(count) * 990, 2),
+        "DISCOUNT_PCT": np.where(discounted, np.round(rng.random(count) * 0.25, 4), 0.0),
+        "REGION": np.array(REGIONS)[rng.integers(0, len(REGIONS), count)],
+    })
+
+
+def _create_macros(db):
+    """Define the Snowflake functions DuckDB lacks; resolved after USE DATABASE."""
+    for signature, body in SKETCH_MACROS.items():
+        db.execute(f"CREATE OR REPLACE MACRO {DATABASE}.main.{signature} AS {body}")
+    db.execute(f"USE {DATABASE}")
+
+
+def seed(db, orders=DEFAULT_ORDERS, end_date=None, random_seed=42):
+    """Create and populate RAW, STAGING and MARTS in a DuckDB connection."""
+    end_date = end_date or date.today()
+    rng = np.random.default_rng(random_seed)
+    for schema in ("RAW", "STAGING", "MARTS", "SEMANTIC"):
+        db.execute(f"CREATE SCHEMA IF NOT EXISTS {DATABASE}.{schema}")
+
+    for table, frame in (
+        ("CUSTOMERS", generate_customers(rng, end_date)),
+        ("PRODUCTS", generate_products(rng)),
+        ("SALES_REPS", generate_sales_reps(rng, end_date)),
+    ):
+        db.register("seed_frame", frame)
+        db.execute(f"CREATE OR REPLACE TABLE {DATABASE}.RAW.{table} AS SELECT * FROM seed_frame")
+        db.unregister("seed_frame")
+
+    for first in range(0, orders, CHUNK_ROWS):
+        db.register("seed_frame", generate_orders(rng, end_date, first + 1, min(CHUNK_ROWS, orders - first)))
+        if first == 0:
+            db.execute(f"CREATE OR REPLACE TABLE {DATABASE}.RAW.ORDERS AS SELECT * FROM seed_frame")
+        else:
+            db.execute(f"INSERT INTO {DATABASE}.RAW.ORDERS SELECT * FROM seed_frame")
+        db.unregister("seed_frame")
+
+    _create_macros(db)
+    for view, sql in STAGING_VIEWS.items():
+        db.execute(f"CREATE OR REPLACE VIEW {DATABASE}.STAGING.{view} AS {sql.format(db=DATABASE)}")
+    for table, sql in MART_TABLES.items():
+        db.execute(f"CREATE OR REPLACE TABLE {DATABASE}.MARTS.{table} AS {sql.format(db=DATABASE)}")
+
+
+def _is_seeded(db):
+    (count,) = db.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_catalog = ? AND table_schema = 'MARTS' AND table_name = 'SALES_BY_CUSTOMER_MONTH' "
+        "AND column_name = 'MONTH'",
+        [DATABASE],
+    ).fetchone()
+    return count > 0
+
+
+class LocalConnection:
+    """DuckDB-backed stand-in for the Snowflake st.connection."""
+
+    def __init__(self, path=None, orders=DEFAULT_ORDERS, end_date=None):
+        if duckdb is None:
+            raise ImportError("The local warehouse needs the duckdb package (pip install duckdb)")
+        self._db = duckdb.connect()
+        self._db.execute(f"ATTACH '{path or ':memory:'}' AS {DATABASE}")
+        self._lock = threading.Lock()
+        if not _is_seeded(self._db):
+            seed(self._db, orders=orders, end_date=end_date)
+
+    def cursor(self):
+        """A cursor of its own; DuckDB cursors are safe to use from one thread each."""
+        with self._lock:
+            cursor = self._db.cursor()
+        cursor.execute(f"USE {DATABASE}")
+        return cursor
+
+    def query(self, sql, ttl=None, params=None, show_spinner=None, **kwargs):
+        """Run SQL and return a DataFrame; ttl and show_spinner are accepted and ignored."""
+        cursor = self.cursor()
+        try:
+            # Through Arrow like Snowflake results: DuckDB's HUGEINT sums arrive as
+            # DECIMAL(38,0), which .df() would turn into float64
+            frame = to_frame(cursor.execute(sql, params or []).to_arrow_table(), owned=True)
+        finally:
+            cursor.close()
+        # Snowflake upper-cases unquoted identifiers
+        frame.columns = [column.upper() for column in frame.columns]
+        return frame
+
+
+def warehouse_backend():
+    """Name of the configured backend: "snowflake" (default) or "local"."""
+    backend = os.environ.get("SALES_WAREHOUSE")
+    if not backend:
+        try:
+            backend = st.secrets.get("sales_warehouse")
+        except Exception:
+            # No secrets.toml
+            backend = None
+    return (backend or "snowflake").lower()
+
+
+def connect_local():
+    """LocalConnection configured from SALES_LOCAL_DB / SALES_LOCAL_ORDERS."""
+    return LocalConnection(
+        path=os.environ.get("SALES_LOCAL_DB"),
+        orders=int(os.environ.get("SALES_LOCAL_ORDERS", DEFAULT_ORDERS)),
+    )
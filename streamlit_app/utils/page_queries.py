@@ -0,0 +1,255 @@
+"""
+Page Queries - The LogicalQuery behind each dashboard page loader
+
+Pages call these builders and pass the result to utils.range_cache, so the
+query a page runs is defined in one place. utils.warmer uses DEFAULT_QUERIES,
+the queries each page issues on load before any widget is touched, to warm a
+fresh deployment before anyone has visited the pages.
+"""
+from utils.query_router import LogicalQuery
+
+
+# Executive Dashboard
+
+def kpis(start_date, end_date):
+    """KPI metrics for the date range."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "GROSS_REVENUE": "gross_revenue",
+            "TOTAL_DISCOUNTS": "discount_amount",
+            "ORDER_COUNT": "order_count",
+            "CUSTOMER_COUNT": "customer_count",
+            "UNITS_SOLD": "units_sold",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+def daily_trend(start_date, end_date):
+    """Daily revenue trend."""
+    return LogicalQuery(
+        measures={"REVENUE": "revenue", "ORDERS": "order_count"},
+        dimensions={"ORDER_DATE": "order_date"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="ORDER_DATE",
+    )
+
+
+def region_breakdown(start_date, end_date):
+    """Revenue by region."""
+    return LogicalQuery(
+        measures={"REVENUE": "revenue", "ORDERS": "order_count"},
+        dimensions={"REGION": "region"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="REVENUE DESC",
+    )
+
+
+# Regional Analysis
+
+def regional_data(start_date, end_date):
+    """Regional sales data by month."""
+    return LogicalQuery(
+        measures={
+            "REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+            "CUSTOMER_COUNT": "customer_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        dimensions={"REGION": "region", "ORDER_MONTH": "month"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="ORDER_MONTH, REGION",
+    )
+
+
+def regional_summary(start_date, end_date):
+    """Regional summary totals."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "TOTAL_ORDERS": "order_count",
+            "TOTAL_CUSTOMERS": "customer_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        dimensions={"REGION": "region"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="TOTAL_REVENUE DESC",
+    )
+
+
+# Product Analysis
+
+def category_summary(start_date, end_date):
+    """Category-level summary."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "TOTAL_ORDERS": "order_count",
+            "TOTAL_UNITS": "units_sold",
+        },
+        dimensions={"CATEGORY": "category"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="TOTAL_REVENUE DESC",
+    )
+
+
+def top_products(start_date, end_date, categories, per_category=5):
+    """Top products by revenue within each selected category."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "TOTAL_ORDERS": "order_count",
+            "TOTAL_UNITS": "units_sold",
+        },
+        dimensions={"PRODUCT_NAME": "product_name", "CATEGORY": "category"},
+        start_date=start_date,
+        end_date=end_date,
+        filters={"category": tuple(sorted(categories))},
+        order_by="TOTAL_REVENUE DESC",
+        limit=per_category,
+        top_per="CATEGORY",
+    )
+
+
+def category_products(start_date, end_date, category, limit=50):
+    """Top products of one category for its drill-down."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "TOTAL_ORDERS": "order_count",
+            "TOTAL_UNITS": "units_sold",
+        },
+        dimensions={"PRODUCT_NAME": "product_name"},
+        start_date=start_date,
+        end_date=end_date,
+        filters={"category": category},
+        order_by="TOTAL_REVENUE DESC",
+        limit=limit,
+    )
+
+
+def category_trend(start_date, end_date):
+    """Monthly trend by category."""
+    return LogicalQuery(
+        measures={"REVENUE": "revenue"},
+        dimensions={"MONTH": "month", "CATEGORY": "category"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="MONTH, CATEGORY",
+    )
+
+
+# Sales Rep Leaderboard
+
+def rep_rankings(start_date, end_date):
+    """Sales rep performance rankings."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "TOTAL_ORDERS": "order_count",
+            "TOTAL_CUSTOMERS": "customer_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        dimensions={"REP_NAME": "rep_name", "REGION": "rep_region"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="TOTAL_REVENUE DESC",
+    )
+
+
+def rep_trends(start_date, end_date):
+    """Monthly trend of every rep in one query."""
+    return LogicalQuery(
+        measures={
+            "REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+            "CUSTOMER_COUNT": "customer_count",
+        },
+        dimensions={"REP_NAME": "rep_name", "MONTH": "month"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="REP_NAME, MONTH",
+    )
+
+
+# Customer Insights
+
+def segment_summary(start_date, end_date):
+    """Summary by customer segment."""
+    return LogicalQuery(
+        measures={
+            "CUSTOMER_COUNT": "customer_count",
+            "TOTAL_REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        dimensions={"SEGMENT": "customer_segment"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="TOTAL_REVENUE DESC",
+    )
+
+
+def customer_page(start_date, end_date, segment=None, after=None, page_size=50):
+    """One page of customers ranked by revenue."""
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+            "FIRST_ORDER_DATE": "first_order_date",
+            "LAST_ORDER_DATE": "last_order_date",
+        },
+        dimensions={
+            "CUSTOMER_ID": "customer_id",
+            "CUSTOMER_NAME": "customer_name",
+            "SEGMENT": "customer_segment",
+        },
+        start_date=start_date,
+        end_date=end_date,
+        filters={"customer_segment": segment} if segment else {},
+        order_by="TOTAL_REVENUE DESC, CUSTOMER_ID DESC",
+        limit=page_size + 1,
+        after=after,
+    )
+
+
+def industry_breakdown(start_date, end_date):
+    """Revenue by industry."""
+    return LogicalQuery(
+        measures={
+            "CUSTOMER_COUNT": "customer_count",
+            "TOTAL_REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+        },
+        dimensions={"INDUSTRY": "industry"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="TOTAL_REVENUE DESC",
+        limit=10,
+    )
+
+
+# Queries run on page load with only the sidebar date range as input
+DEFAULT_QUERIES = (
+    kpis,
+    daily_trend,
+    region_breakdown,
+    regional_data,
+    regional_summary,
+    category_summary,
+    category_trend,
+    rep_rankings,
+    rep_trends,
+    segment_summary,
+    customer_page,
+    industry_breakdown,
+)
@@ -0,0 +1,120 @@
+"""
+Pruning - Partitions scanned versus total for the registered page queries
+
+FCT_ORDERS and the date-grained rollups are clustered on their date column
+(see snowflake_setup.sql), so a 30-day page query should read a small share
+of the table's micro-partitions. diagnose() replays the page queries recorded
+by utils.range_cache (the same registry utils.warmer replays) as the router
+plans them today, with the result cache off, and reads each table scan's
+partitions scanned and total from GET_QUERY_OPERATOR_STATS. Scans reading
+more than POOR_PRUNING of a table that has at least MIN_PARTITIONS
+partitions are flagged; smaller tables are cheap to scan whole anyway.
+
+Needs Snowflake; the local DuckDB warehouse has no query profile.
+"""
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+
+from utils.instrumentation import statement
+from utils.query_router import plan
+from utils.range_cache import recent_queries
+from utils.warmer import load_registry
+
+# Share of a table's partitions above which a date-range scan is flagged
+POOR_PRUNING = 0.5
+
+# Tables with fewer partitions are not flagged
+MIN_PARTITIONS = 16
+
+
+@dataclass
+class ScanReport:
+    """One table scan of one replayed page query."""
+    query: str                  # measures, dimensions and window
+    source: str                 # table the router chose
+    table: str                  # table scanned (a plan may read several)
+    window_days: int
+    partitions_scanned: int
+    partitions_total: int
+    bytes_scanned: int = None
+    query_id: str = None
+
+    @property
+    def scanned_share(self):
+        return self.partitions_scanned / self.partitions_total if self.partitions_total else 0.0
+
+    @property
+    def poor(self):
+        return self.partitions_total >= MIN_PARTITIONS and self.scanned_share > POOR_PRUNING
+
+
+def describe(query, days):
+    """Short label for a page query, e.g. "revenue, order_count by region (365d)"."""
+    grouped = ", ".join(query.dimensions.values()) or "total"
+    filters = "".join(f" where {name}" for name in query.filters)
+    return f"{', '.join(query.measures.values())} by {grouped}{filters} ({days}d)"
+
+
+@contextmanager
+def _raw_session(conn):
+    """A raw Snowflake connection whose session settings we may change."""
+    if hasattr(conn, "checkout"):
+        with conn.checkout() as member:
+            yield member.conn.raw_connection
+    elif hasattr(conn, "raw_connection"):
+        yield conn.raw_connection
+    else:
+        raise RuntimeError("Pruning diagnostics need a Snowflake connection")
+
+
+def _scans(cursor, query_id):
+    cursor.execute("""
+        SELECT
+            OPERATOR_ATTRIBUTES:table_name::VARCHAR AS TABLE_NAME,
+            OPERATOR_STATISTICS:pruning:partitions_scanned::NUMBER AS PARTITIONS_SCANNED,
+            OPERATOR_STATISTICS:pruning:partitions_total::NUMBER AS PARTITIONS_TOTAL,
+            OPERATOR_STATISTICS:io:bytes_scanned::NUMBER AS BYTES_SCANNED
+        FROM TABLE(GET_QUERY_OPERATOR_STATS(?))
+        WHERE OPERATOR_TYPE = 'TableScan'
+    """, [query_id])
+    return cursor.fetchall()
+
+
+def diagnose(conn, windows=None, today=None):
+    """Replay the registered page queries and return a ScanReport per table scan.
+
+    windows limits the replay to those window lengths in days.
+    """
+    load_registry()
+    today = today or date.today()
+    reports = []
+    with _raw_session(conn) as raw:
+        with closing(raw.cursor()) as cursor:
+            # A result-cache hit scans nothing and has no operator statistics
+            cursor.execute("ALTER SESSION SET USE_CACHED_RESULT = FALSE")
+            try:
+                for template, days in recent_queries():
+                    if windows is not None and days not in windows:
+                        continue
+                    query = replace(template, start_date=today - timedelta(days=days), end_date=today)
+                    query_plan = plan(query)
+                    with statement(f"pruning:{query_plan.source}") as event:
+                        cursor.execute(query_plan.sql, list(query_plan.params) or None)
+                        event.rows = len(cursor.fetchall())
+                        event.query_id = query_id = cursor.sfqid
+                    for table, scanned, total, bytes_scanned in _scans(cursor, query_id):
+                        reports.append(ScanReport(
+                            query=describe(query, days),
+                            source=query_plan.source,
+                            table=table,
+                            window_days=days,
+                            partitions_scanned=scanned or 0,
+                            partitions_total=total or 0,
+                            bytes_scanned=bytes_scanned,
+                            query_id=query_id,
+                        ))
+            finally:
+                # The session goes back to a shared pool
+                cursor.execute("ALTER SESSION UNSET USE_CACHED_RESULT")
+    return reports
@@ -0,0 +1,80 @@
+"""
+Query Fusion - Collect concurrent warehouse queries and run siblings together
+
+A page's loaders start together (see utils.batch_loader), so their cache
+misses reach the warehouse within a few milliseconds of each other. The
+Batcher holds the first miss for FUSION_WINDOW, collects every query that
+arrives meanwhile, and lets a grouping function decide which of them can be
+answered by one statement (see query_router.plan_fused). Each group is then
+executed once, on the thread of its first member, while the other members wait
+for their share of the result; queries that fit no group run as before, in
+parallel on their own threads.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+# How long the first query of a batch waits for siblings
+FUSION_WINDOW = 0.01
+
+
+class _Batch:
+    def __init__(self):
+        self.queries = []
+        self.ready = threading.Event()
+        self.assignments = None     # per query: (group queries, index, future, runs it)
+
+
+class Batcher:
+    """Coalesce queries submitted close together on the same connection.
+
+    group(queries) returns lists of indices that should run together, and
+    run_group(conn, queries) returns one result per query of a group.
+    """
+
+    def __init__(self, group, run_group, window=FUSION_WINDOW):
+        self._group = group
+        self._run_group = run_group
+        self.window = window
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def submit(self, conn, query):
+        """Run query, possibly as part of a fused statement, and return its result."""
+        with self._lock:
+            batch = self._open.get(id(conn))
+            leader = batch is None
+            if leader:
+                batch = self._open[id(conn)] = _Batch()
+            index = len(batch.queries)
+            batch.queries.append(query)
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                del self._open[id(conn)]
+            self._assign(batch)
+        batch.ready.wait()
+
+        queries, position, future, runs = batch.assignments[index]
+        if runs:
+            try:
+                future.set_result(self._run_group(conn, queries))
+            except Exception as error:
+                future.set_exception(error)
+        return future.result()[position]
+
+    def _assign(self, batch):
+        assignments = [None] * len(batch.queries)
+        try:
+            groups = self._group(batch.queries)
+        except Exception:
+            # Grouping is an optimisation only; fall back to one query each
+            groups = [[i] for i in range(len(batch.queries))]
+        for indices in groups:
+            future = Future()
+            queries = [batch.queries[i] for i in indices]
+            for position, i in enumerate(indices):
+                assignments[i] = (queries, position, future, position == 0)
+        batch.assignments = assignments
+        batch.ready.set()
@@ -0,0 +1,595 @@
+"""
+Query Router - Serve logical page queries from the smallest exact MARTS rollup
+
+Pages describe what they need (measures, group-by dimensions, date range) as a
+LogicalQuery. The router picks the cheapest source that answers it exactly:
+one of the aggregation Dynamic Tables, topped up with FCT_ORDERS only for the
+ragged days at the edges of a month-grained rollup, or FCT_ORDERS alone when a
+non-additive measure cannot be recombined from rollup rows. With
+SALES_DISTINCT_MODE=approximate, distinct customer counts are merged from
+HyperLogLog sketches, kept in a *_CUSTOMER_SKETCH mart joined to the rollup,
+instead of falling back to FCT_ORDERS.
+
+Dates and filter values are sent as bind variables (qmark style, see
+utils.connection_pool.snowflake_pool), so the SQL text depends only on the
+shape of the query. Changing the date range or the selected rep re-runs the
+same statement text, which lets Snowflake reuse its compiled plan and result
+cache.
+
+Queries over the same rows (equal date range and filters) can also be planned
+together with plan_fused: one GROUPING SETS aggregate over FCT_ORDERS with a
+grouping set per query (see utils.range_cache and utils.query_fusion).
+"""
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from utils.instrumentation import execute
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+# Base measures: expression over FCT_ORDERS and how partial results recombine
+MEASURES = {
+    "revenue": ("SUM(NET_AMOUNT)", "SUM"),
+    "gross_revenue": ("SUM(GROSS_AMOUNT)", "SUM"),
+    "discount_amount": ("SUM(DISCOUNT_AMOUNT)", "SUM"),
+    "order_count": ("COUNT(*)", "SUM"),
+    "units_sold": ("SUM(QUANTITY)", "SUM"),
+    "first_order_date": ("MIN(ORDER_DATE)", "MIN"),
+    "last_order_date": ("MAX(ORDER_DATE)", "MAX"),
+    "customer_count": ("COUNT(DISTINCT CUSTOMER_ID)", None),
+}
+
+# Mergeable sketches of non-additive measures: (accumulate over FCT_ORDERS,
+# combine partial states, estimate from a state). Rollups store accumulated
+# states, so a distinct count over any range can be merged from rollup rows.
+SKETCHES = {
+    "customer_count": ("HLL_ACCUMULATE(CUSTOMER_ID)", "HLL_COMBINE", "HLL_ESTIMATE"),
+}
+
+# "exact" answers distinct counts from FCT_ORDERS (or rollup rows pinned one to
+# one); "approximate" may merge HyperLogLog sketches instead, typically within
+# a few percent, when that avoids a fact-table scan.
+DISTINCT_MODE = os.environ.get("SALES_DISTINCT_MODE", "exact").lower()
+
+# Derived measures: template over base measure partials
+DERIVED_MEASURES = {
+    "avg_order_value": ("SUM({revenue}) / NULLIF(SUM({order_count}), 0)", ("revenue", "order_count")),
+}
+
+# Logical dimension -> FCT_ORDERS expression
+FACT_DIMENSIONS = {
+    "order_date": "ORDER_DATE",
+    "month": "ORDER_MONTH",
+    "region": "ORDER_REGION",
+    "customer_id": "CUSTOMER_ID",
+    "customer_name": "CUSTOMER_NAME",
+    "customer_segment": "CUSTOMER_SEGMENT",
+    "industry": "INDUSTRY",
+    "product_id": "PRODUCT_ID",
+    "product_name": "PRODUCT_NAME",
+    "category": "CATEGORY",
+    "subcategory": "SUBCATEGORY",
+    "sales_rep_id": "SALES_REP_ID",
+    "rep_name": "REP_NAME",
+    "team": "TEAM",
+    "rep_region": "REP_REGION",
+}
+
+# Rough fact-table density used to cost edge scans and the full fallback
+FACT_ROWS_PER_DAY = 150
+
+# Nominal span used to cost queries without a date range
+UNBOUNDED_DAYS = 730
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """An aggregation Dynamic Table the router can read from."""
+    table: str
+    grain: str                  # "day", "month" or None (no date grain)
+    date_column: str
+    dimensions: dict
+    measures: dict
+    keys: frozenset             # dimensions identifying one rollup row
+    rows_per_partition: int     # rows per day/month (or total when grain is None)
+    sketches: dict = field(default_factory=dict)    # measure -> sketch state column
+    sketch_table: str = None    # mart holding the sketch columns at this grain
+    sketch_keys: tuple = ()     # columns joining a rollup row to its sketch row
+
+
+ROLLUPS = (
+    Rollup(
+        table="DAILY_SALES",
+        grain="day",
+        date_column="ORDER_DATE",
+        dimensions={
+            "order_date": "ORDER_DATE",
+            "month": "DATE_TRUNC('month', ORDER_DATE)",
+        },
+        measures={
+            "revenue": "REVENUE",
+            "gross_revenue": "GROSS_REVENUE",
+            "discount_amount": "DISCOUNT_TOTAL",
+            "order_count": "ORDER_COUNT",
+            "units_sold": "UNITS_SOLD",
+            "first_order_date": "ORDER_DATE",
+            "last_order_date": "ORDER_DATE",
+            "customer_count": "CUSTOMER_COUNT",
+        },
+        keys=frozenset({"order_date"}),
+        rows_per_partition=1,
+        sketches={"customer_count": "CUSTOMER_HLL"},
+        sketch_table="DAILY_CUSTOMER_SKETCH",
+        sketch_keys=("ORDER_DATE",),
+    ),
+    Rollup(
+        table="SALES_BY_REGION",
+        grain="month",
+        date_column="ORDER_MONTH",
+        dimensions={"region": "REGION", "month": "ORDER_MONTH"},
+        measures={
+            "revenue": "REVENUE",
+            "order_count": "ORDER_COUNT",
+            "customer_count": "CUSTOMER_COUNT",
+        },
+        keys=frozenset({"region", "month"}),
+        rows_per_partition=4,
+        sketches={"customer_count": "CUSTOMER_HLL"},
+        sketch_table="REGION_CUSTOMER_SKETCH",
+        sketch_keys=("REGION", "ORDER_MONTH"),
+    ),
+    Rollup(
+        table="SALES_BY_REP",
+        grain="month",
+        date_column="MONTH",
+        dimensions={
+            "sales_rep_id": "SALES_REP_ID",
+            "rep_name": "REP_NAME",
+            "team": "TEAM",
+            "rep_region": "REGION",
+            "month": "MONTH",
+        },
+        measures={
+            "revenue": "REVENUE",
+            "order_count": "ORDER_COUNT",
+            "customer_count": "CUSTOMER_COUNT",
+        },
+        # REP_NAME is unique per rep, so it pins a row as well as SALES_REP_ID
+        keys=frozenset({"rep_name", "month"}),
+        rows_per_partition=50,
+        sketches={"customer_count": "CUSTOMER_HLL"},
+        sketch_table="REP_CUSTOMER_SKETCH",
+        sketch_keys=("SALES_REP_ID", "MONTH"),
+    ),
+    Rollup(
+        table="SALES_BY_PRODUCT",
+        grain="month",
+        date_column="MONTH",
+        dimensions={
+            "product_id": "PRODUCT_ID",
+            "product_name": "PRODUCT_NAME",
+            "category": "CATEGORY",
+            "subcategory": "SUBCATEGORY",
+            "month": "MONTH",
+        },
+        measures={
+            "revenue": "REVENUE",
+            "order_count": "ORDER_COUNT",
+            "units_sold": "UNITS_SOLD",
+        },
+        keys=frozenset({"product_id", "month"}),
+        rows_per_partition=500,
+    ),
+    Rollup(
+        table="SALES_BY_CUSTOMER",
+        grain=None,
+        date_column=None,
+        dimensions={
+            "customer_id": "CUSTOMER_ID",
+            "customer_name": "CUSTOMER_NAME",
+            "customer_segment": "CUSTOMER_SEGMENT",
+            "industry": "INDUSTRY",
+        },
+        measures={
+            "revenue": "TOTAL_REVENUE",
+            "order_count": "ORDER_COUNT",
+            "first_order_date": "FIRST_ORDER_DATE",
+            "last_order_date": "LAST_ORDER_DATE",
+        },
+        keys=frozenset({"customer_id"}),
+        rows_per_partition=10000,
+    ),
+    Rollup(
+        table="SALES_BY_CUSTOMER_MONTH",
+        grain="month",
+        date_column="MONTH",
+        dimensions={
+            "customer_id": "CUSTOMER_ID",
+            "customer_name": "CUSTOMER_NAME",
+            "customer_segment": "CUSTOMER_SEGMENT",
+            "industry": "INDUSTRY",
+            "month": "MONTH",
+        },
+        measures={
+            "revenue": "REVENUE",
+            "order_count": "ORDER_COUNT",
+            "first_order_date": "FIRST_ORDER_DATE",
+            "last_order_date": "LAST_ORDER_DATE",
+        },
+        keys=frozenset({"customer_id", "month"}),
+        # ~4,500 orders a month spread over 10,000 customers
+        rows_per_partition=3600,
+    ),
+)
+
+
+@dataclass(frozen=True)
+class LogicalQuery:
+    """What a page needs, independent of which table serves it.
+
+    measures and dimensions map output column aliases to logical names, e.g.
+    {"TOTAL_REVENUE": "revenue"}. filters maps logical dimensions to a value
+    they must equal, or to a tuple of allowed values. With top_per set to an
+    output alias, limit applies within each value of that column (top N per
+    group) instead of to the whole result. after holds the order_by values of
+    the last row already seen (keyset pagination); order_by must then be a
+    total order, e.g. ending in a unique id column.
+    """
+    measures: dict
+    dimensions: dict = field(default_factory=dict)
+    start_date: object = None
+    end_date: object = None
+    filters: dict = field(default_factory=dict)
+    order_by: str = None
+    limit: int = None
+    top_per: str = None
+    after: tuple = None
+
+    def __hash__(self):
+        return hash((
+            tuple(self.measures.items()),
+            tuple(self.dimensions.items()),
+            self.start_date,
+            self.end_date,
+            tuple(self.filters.items()),
+            self.order_by,
+            self.limit,
+            self.top_per,
+            self.after,
+        ))
+
+    def base_measures(self):
+        """Base measures needed to compute every requested measure."""
+        needed = []
+        for name in self.measures.values():
+            parts = DERIVED_MEASURES[name][1] if name in DERIVED_MEASURES else (name,)
+            for part in parts:
+                if part not in needed:
+                    needed.append(part)
+        return needed
+
+
+@dataclass
+class QueryPlan:
+    """The SQL chosen for a LogicalQuery, its bind values and the tables it reads."""
+    sql: str
+    source: str
+    sources: tuple
+    params: tuple = ()
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_range(start_date, end_date, grain):
+    """Split a date range into the part a rollup covers and ragged edge ranges.
+
+    Returns (covered, edges) where covered is a (start, end) pair of partition
+    keys or None, and edges is a list of (start, end) day ranges that must come
+    from the fact table.
+    """
+    if start_date is None or end_date is None or grain == "day":
+        return (start_date, end_date), []
+
+    first_full = start_date if start_date.day == 1 else _next_month(start_date)
+    last_full = end_date if _next_month(end_date) - timedelta(days=1) == end_date else _month_start(end_date) - timedelta(days=1)
+
+    if first_full > last_full:
+        return None, [(start_date, end_date)]
+
+    edges = []
+    if start_date < first_full:
+        edges.append((start_date, first_full - timedelta(days=1)))
+    if end_date > last_full:
+        edges.append((last_full + timedelta(days=1), end_date))
+    return (first_full, _month_start(last_full)), edges
+
+
+def _can_answer(rollup, query, sketched=False):
+    bounded = query.start_date is not None and query.end_date is not None
+    if bounded and rollup.grain is None:
+        return False
+    if not set(query.dimensions.values()) | set(query.filters) <= set(rollup.dimensions):
+        return False
+    base = query.base_measures()
+    if not set(base) <= set(rollup.measures):
+        return False
+    exact = [m for m in base if MEASURES[m][1] is None and not (sketched and m in rollup.sketches)]
+    if exact:
+        # Distinct counts only survive when each output row is one rollup row
+        pinned = set(query.dimensions.values()) | set(query.filters)
+        if not rollup.keys <= pinned:
+            return False
+    return True
+
+
+def _days(start_date, end_date):
+    return (end_date - start_date).days + 1
+
+
+def _cost(rollup, query):
+    if query.start_date is None or query.end_date is None:
+        return rollup.rows_per_partition if rollup.grain is None else rollup.rows_per_partition * UNBOUNDED_DAYS
+    covered, edges = split_range(query.start_date, query.end_date, rollup.grain)
+    cost = sum(FACT_ROWS_PER_DAY * _days(s, e) for s, e in edges)
+    if covered is not None:
+        if rollup.grain == "day":
+            cost += rollup.rows_per_partition * _days(*covered)
+        else:
+            months = (covered[1].year - covered[0].year) * 12 + covered[1].month - covered[0].month + 1
+            cost += rollup.rows_per_partition * months
+    return cost
+
+
+def choose_rollup(query, sketched=False):
+    """Return the cheapest rollup that answers the query exactly, or None.
+
+    With sketched=True, distinct counts may be merged from sketch columns.
+    """
+    candidates = [r for r in ROLLUPS if _can_answer(r, query, sketched)]
+    fact_cost = FACT_ROWS_PER_DAY * (
+        _days(query.start_date, query.end_date)
+        if query.start_date is not None and query.end_date is not None
+        else UNBOUNDED_DAYS
+    )
+    best = min(candidates, key=lambda r: _cost(r, query), default=None)
+    if best is None or _cost(best, query) >= fact_cost:
+        return None
+    return best
+
+
+def _where(dimensions, date_column, date_range, filters):
+    """WHERE conditions for a date range and dimension filters, with their binds."""
+    where, params = [], []
+    if date_range is not None and date_range[0] is not None:
+        where.append(f"{date_column} BETWEEN ? AND ?")
+        params += [date_range[0], date_range[1]]
+    for name, value in filters.items():
+        if isinstance(value, tuple):
+            if not value:
+                where.append("FALSE")
+                continue
+            where.append(f"{dimensions[name]} IN ({', '.join('?' for _ in value)})")
+            params += value
+        else:
+            where.append(f"{dimensions[name]} = ?")
+            params.append(value)
+    return where, params
+
+
+def _piece(table, dimensions, measures, date_column, date_range, filters, query, join=None):
+    """SELECT producing partial aggregates for one source slice, with its binds."""
+    select = [f"{dimensions[name]} AS {alias}" for alias, name in query.dimensions.items()]
+    select += [f"{measures(name)} AS {name.upper()}" for name in query.base_measures()]
+    where, params = _where(dimensions, date_column, date_range, filters)
+
+    sql = f"SELECT {', '.join(select)}\n    FROM {DATABASE}.MARTS.{table}"
+    if join:
+        sql += f"\n    {join}"
+    if where:
+        sql += "\n    WHERE " + "\n      AND ".join(where)
+    group_by = [dimensions[name] for name in query.dimensions.values()]
+    if group_by:
+        sql += "\n    GROUP BY " + ", ".join(group_by)
+    return sql, params
+
+
+def order_terms(order_by):
+    """Split "A DESC, B" into [("A", True), ("B", False)]."""
+    terms = []
+    for term in order_by.split(","):
+        parts = term.split()
+        terms.append((parts[0], len(parts) > 1 and parts[1].upper() == "DESC"))
+    return terms
+
+
+def _keyset_predicate(order_by, after):
+    """WHERE clause selecting the rows that sort after the given key."""
+    terms = order_terms(order_by)
+    clauses, params = [], []
+    for i, (column, descending) in enumerate(terms):
+        equal = [f"{c} = ?" for c, _ in terms[:i]]
+        clauses.append("(" + " AND ".join(equal + [f"{column} {'<' if descending else '>'} ?"]) + ")")
+        params += list(after[:i]) + [after[i]]
+    return " OR ".join(clauses), params
+
+
+def _fact_piece(query, date_range, sketched=()):
+    def partial(name):
+        return SKETCHES[name][0] if name in sketched else MEASURES[name][0]
+
+    return _piece(
+        "FCT_ORDERS",
+        FACT_DIMENSIONS,
+        partial,
+        "ORDER_DATE",
+        date_range,
+        query.filters,
+        query,
+    )
+
+
+def _choose(query):
+    """(rollup or None, measures merged from sketches) for a query."""
+    rollup = choose_rollup(query)
+    if rollup is not None or DISTINCT_MODE != "approximate":
+        return rollup, ()
+    # Sketches only where the exact plan would have to scan the fact table
+    sketched_rollup = choose_rollup(query, sketched=True)
+    if sketched_rollup is None:
+        return None, ()
+    sketched = tuple(m for m in query.base_measures() if m in sketched_rollup.sketches and MEASURES[m][1] is None)
+    return sketched_rollup, sketched
+
+
+def plan(query):
+    """Build the SQL answering a LogicalQuery from the cheapest exact source.
+
+    In approximate distinct mode a query that would otherwise scan FCT_ORDERS
+    may instead merge the sketch columns of a rollup.
+    """
+    rollup, sketched = _choose(query)
+    if rollup is None:
+        pieces = [_fact_piece(query, (query.start_date, query.end_date))]
+        source = "FCT_ORDERS"
+        sources = ("FCT_ORDERS",)
+    else:
+        covered, edges = split_range(query.start_date, query.end_date, rollup.grain)
+        pieces = []
+        if covered is not None:
+            def merge(name):
+                if name in sketched:
+                    return f"{SKETCHES[name][1]}({rollup.sketches[name]})"
+                return f"{MEASURES[name][1] or 'SUM'}({rollup.measures[name]})"
+
+            # Sketches are kept in their own mart; a row it has not caught up
+            # with yet merges as NULL, which HLL_COMBINE skips
+            join = (
+                f"LEFT JOIN {DATABASE}.MARTS.{rollup.sketch_table} USING ({', '.join(rollup.sketch_keys)})"
+                if sketched else None
+            )
+            pieces.append(_piece(
+                rollup.table, rollup.dimensions, merge, rollup.date_column,
+                covered, query.filters, query, join,
+            ))
+        pieces += [_fact_piece(query, edge, sketched) for edge in edges]
+        source = rollup.table
+        sources = (rollup.table, rollup.sketch_table) if sketched else (rollup.table,)
+        sources += ("FCT_ORDERS",) if edges else ()
+
+    select = list(query.dimensions)
+    for alias, name in query.measures.items():
+        if name in DERIVED_MEASURES:
+            template, parts = DERIVED_MEASURES[name]
+            expr = template.format(**{part: part.upper() for part in parts})
+        elif name in sketched:
+            _, combine, estimate = SKETCHES[name]
+            expr = f"{estimate}({combine}({name.upper()}))"
+        else:
+            expr = f"{MEASURES[name][1] or 'SUM'}({name.upper()})"
+        select.append(f"{expr} AS {alias}")
+
+    sql = f"SELECT {', '.join(select)}\nFROM (\n    " + "\n    UNION ALL\n    ".join(sql for sql, _ in pieces) + "\n)"
+    if query.dimensions:
+        sql += "\nGROUP BY " + ", ".join(query.dimensions)
+    params = [value for _, piece_params in pieces for value in piece_params]
+    if query.after is not None:
+        # Filter on the aggregated values, so wrap before ordering and limiting
+        predicate, after_params = _keyset_predicate(query.order_by, query.after)
+        sql = f"SELECT *\nFROM (\n{sql}\n)\nWHERE {predicate}"
+        params += after_params
+    if query.top_per:
+        # Rank within each group server-side so only the top rows are sent
+        sql += (
+            f"\nQUALIFY ROW_NUMBER() OVER (PARTITION BY {query.top_per} ORDER BY {query.order_by})"
+            f" <= {int(query.limit)}"
+            f"\nORDER BY {query.top_per}, {query.order_by}"
+        )
+    else:
+        if query.order_by:
+            sql += f"\nORDER BY {query.order_by}"
+        if query.limit is not None:
+            sql += f"\nLIMIT {int(query.limit)}"
+    return QueryPlan(sql=sql, source=source, sources=sources, params=tuple(params))
+
+
+def fusion_key(query):
+    """Queries with equal keys aggregate the same FCT_ORDERS rows; None if not fusable.
+
+    Top-N and keyset queries are left alone: fusing them would transfer every
+    candidate row instead of one page.
+    """
+    if query.limit is not None or query.after is not None or query.top_per:
+        return None
+    return (query.start_date, query.end_date, tuple(sorted(query.filters.items())))
+
+
+def needs_fact_scan(query):
+    """True when no rollup answers the query, so it scans FCT_ORDERS anyway."""
+    return _choose(query)[0] is None
+
+
+def fused_dimensions(queries):
+    """Logical dimensions of a fused plan, in the order of its GROUPING() bits."""
+    dimensions = []
+    for query in queries:
+        for name in query.dimensions.values():
+            if name not in dimensions:
+                dimensions.append(name)
+    return dimensions
+
+
+def fused_alias(name):
+    """Output column of a logical dimension in a fused plan."""
+    return f"DIM_{name.upper()}"
+
+
+def grouping_id(query, dimensions):
+    """GROUPING() value of the rows belonging to query in a fused plan."""
+    grouped = set(query.dimensions.values())
+    return sum(1 << (len(dimensions) - 1 - i) for i, name in enumerate(dimensions) if name not in grouped)
+
+
+def plan_fused(queries):
+    """One FCT_ORDERS scan answering queries with equal fusion keys.
+
+    Each query becomes a grouping set of a GROUPING SETS aggregate that
+    returns base measures only; rows carry GROUPING_ID (see grouping_id) so
+    the caller can split them back into per-query results.
+    """
+    first = queries[0]
+    dimensions = fused_dimensions(queries)
+    base = []
+    for query in queries:
+        base += [name for name in query.base_measures() if name not in base]
+
+    select = [f"{FACT_DIMENSIONS[name]} AS {fused_alias(name)}" for name in dimensions]
+    select += [f"{MEASURES[name][0]} AS {name.upper()}" for name in base]
+    if dimensions:
+        select.append(f"GROUPING({', '.join(FACT_DIMENSIONS[name] for name in dimensions)}) AS GROUPING_ID")
+    where, params = _where(FACT_DIMENSIONS, "ORDER_DATE", (first.start_date, first.end_date), first.filters)
+
+    sets = []
+    for query in queries:
+        grouping_set = "(" + ", ".join(FACT_DIMENSIONS[name] for name in dimensions if name in query.dimensions.values()) + ")"
+        if grouping_set not in sets:
+            sets.append(grouping_set)
+
+    sql = f"SELECT {', '.join(select)}\nFROM {DATABASE}.MARTS.FCT_ORDERS"
+    if where:
+        sql += "\nWHERE " + "\n  AND ".join(where)
+    sql += f"\nGROUP BY GROUPING SETS ({', '.join(sets)})"
+    return QueryPlan(sql=sql, source="FCT_ORDERS", sources=("FCT_ORDERS",), params=tuple(params))
+
+
+def run_query(conn, query):
+    """Execute a LogicalQuery on the connection and return a DataFrame."""
+    query_plan = plan(query)
+    # Results are cached by utils.range_cache, so skip the connection's own cache
+    return execute(conn, query_plan.sql, list(query_plan.params) or None, name=query_plan.source)
@@ -0,0 +1,312 @@
+"""
+Range Cache - Reuse overlapping date windows across page queries
+
+Additive aggregates are cached per calendar-month partition (or the part of a
+month a range touches). A requested range is decomposed into partitions, only
+the missing ones are fetched from the warehouse, and the pieces are merged back
+together in pandas. Widening 90D to 1Y or moving the end date by a day then
+only fetches the partitions that were not already cached.
+
+Every entry is tagged with the data version of the Dynamic Tables it was read
+from (see utils.freshness) and is dropped only when one of those tables has
+refreshed with new data. Storage is pluggable (see utils.cache_backends), so
+replicas can share one warm cache directory. Queries over windows ending today
+are remembered so utils.warmer can re-run them before users arrive.
+
+Misses that reach the warehouse at the same time go through a Batcher (see
+utils.query_fusion): sibling queries over the same rows, at least one of which
+scans FCT_ORDERS, run as one GROUPING SETS statement, and uncached queries other
+pages recently asked over the same window ride along so their results are
+cached before the user navigates there.
+"""
+import threading
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+
+import pandas as pd
+
+from utils.cache_backends import backend_from_env
+from utils.freshness import data_version
+from utils.instrumentation import execute, note_cache
+from utils.query_fusion import Batcher
+from utils.query_router import (
+    DERIVED_MEASURES, MEASURES, LogicalQuery, fused_alias, fused_dimensions, fusion_key,
+    grouping_id, needs_fact_scan, order_terms, plan, plan_fused, run_query,
+)
+
+PARTITION_COLUMN = "PARTITION_MONTH"
+
+# Distinct rolling-window queries remembered for utils.warmer
+MAX_RECENT_QUERIES = 200
+
+# Queries from other pages added to a fused fact-table scan
+MAX_SIBLINGS = 6
+
+_cache = backend_from_env()
+
+_recent = {}                    # (query without dates, window days) -> last used
+_recent_lock = threading.Lock()
+
+
+def get_range_cache():
+    """Return the process-wide cache backend."""
+    return _cache
+
+
+def remember_all(entries):
+    """Record (query without dates, window days, last used) entries.
+
+    An entry already known keeps its later use time, so seeding a query with
+    used_at=0 never makes a recently used one look idle.
+    """
+    with _recent_lock:
+        for template, days, used_at in entries:
+            key = (template, days)
+            _recent[key] = max(used_at, _recent.get(key, used_at))
+        while len(_recent) > MAX_RECENT_QUERIES:
+            del _recent[min(_recent, key=_recent.get)]
+
+
+def recent_usage():
+    """(query without dates, window days, last used) entries, most recent last."""
+    with _recent_lock:
+        return sorted(((*key, used_at) for key, used_at in _recent.items()), key=lambda entry: entry[2])
+
+
+def recent_queries(since=None):
+    """(query without dates, window days) pairs of windows ending today.
+
+    With since (a time.time() value), only those used since then.
+    """
+    return [(template, days) for template, days, used_at in recent_usage() if since is None or used_at >= since]
+
+
+def _remember(query):
+    # Only windows ending today can be replayed later as "the last N days"
+    if query.start_date is None or query.end_date != date.today() or query.after is not None:
+        return
+    template = replace(query, start_date=None, end_date=None)
+    remember_all([(template, (query.end_date - query.start_date).days, time.time())])
+
+
+def partitions(start_date, end_date):
+    """Split a date range into (start, end) pieces that each sit in one month."""
+    pieces = []
+    current = start_date
+    while current <= end_date:
+        next_month = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        piece_end = min(end_date, next_month - timedelta(days=1))
+        pieces.append((current, piece_end))
+        current = piece_end + timedelta(days=1)
+    return pieces
+
+
+def _shape_key(query):
+    """Identify a query independent of its date range, ordering and limit."""
+    return (
+        tuple(sorted(query.dimensions.items())),
+        tuple(query.base_measures()),
+        tuple(sorted(query.filters.items())),
+    )
+
+
+def _is_decomposable(query):
+    if query.start_date is None or query.end_date is None or query.limit is not None:
+        # Top-N results cannot be merged without every candidate row
+        return False
+    return all(MEASURES[name][1] is not None for name in query.base_measures())
+
+
+def _spans(missing):
+    """Group consecutive missing partitions into contiguous fetch ranges."""
+    spans = []
+    for start, end in missing:
+        if spans and spans[-1][1] + timedelta(days=1) == start:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def _fetch_partitions(conn, query, span):
+    """Fetch one contiguous span and split it into per-partition frames."""
+    # A query already grouped by month is partitioned by its own month column
+    month = next((alias for alias, name in query.dimensions.items() if name == "month"), None)
+    partial = LogicalQuery(
+        measures={name.upper(): name for name in query.base_measures()},
+        dimensions=query.dimensions if month else {**query.dimensions, PARTITION_COLUMN: "month"},
+        start_date=span[0],
+        end_date=span[1],
+        filters=query.filters,
+    )
+    frame = _batcher.submit(conn, partial)
+    extra = [] if month else [PARTITION_COLUMN]
+    by_month = {
+        pd.Timestamp(key).date(): group.drop(columns=extra)
+        for key, group in frame.groupby(month or PARTITION_COLUMN)
+    }
+    empty = frame.drop(columns=extra).iloc[0:0]
+    return {
+        piece: by_month.get(piece[0].replace(day=1), empty)
+        for piece in partitions(*span)
+    }
+
+
+def _apply_order(frame, order_by):
+    terms = order_terms(order_by)
+    return frame.sort_values([c for c, _ in terms], ascending=[not desc for _, desc in terms])
+
+
+def _merge(query, frames):
+    """Recombine per-partition partial aggregates into the requested result."""
+    combined = pd.concat(frames, ignore_index=True)
+    aggregations = {name.upper(): MEASURES[name][1].lower() for name in query.base_measures()}
+    dims = list(query.dimensions)
+    if dims:
+        merged = combined.groupby(dims, as_index=False, dropna=False).agg(aggregations)
+    else:
+        # Column by column: a one-row transpose would turn every column to object
+        merged = pd.DataFrame({column: [combined[column].agg(how)] for column, how in aggregations.items()})
+
+    return _finish(query, merged)
+
+
+def _finish(query, merged):
+    """Compute the requested measures from base measure columns and order."""
+    result = merged[list(query.dimensions)].copy()
+    for alias, name in query.measures.items():
+        if name in DERIVED_MEASURES:
+            numerator, denominator = (merged[part.upper()].astype(float) for part in DERIVED_MEASURES[name][1])
+            result[alias] = numerator / denominator.where(denominator != 0)
+        else:
+            result[alias] = merged[name.upper()]
+
+    if query.order_by:
+        result = _apply_order(result, query.order_by)
+    return result.reset_index(drop=True)
+
+
+def _sources(query):
+    """Tables a query may read, including the fact table used for edge days."""
+    return set(plan(query).sources) | {"FCT_ORDERS"}
+
+
+def _group(queries):
+    """Indices of queries to run as one statement.
+
+    Queries over the same rows fuse when at least one of them scans
+    FCT_ORDERS anyway; identical queries always run once.
+    """
+    by_key = {}
+    for i, query in enumerate(queries):
+        key = fusion_key(query)
+        by_key.setdefault(("query", query) if key is None else key, []).append(i)
+    groups = []
+    for indices in by_key.values():
+        members = {queries[i] for i in indices}
+        if len(members) > 1 and any(needs_fact_scan(query) for query in members):
+            groups.append(indices)
+        else:
+            same = {}
+            for i in indices:
+                same.setdefault(queries[i], []).append(i)
+            groups += same.values()
+    return groups
+
+
+def _siblings(conn, group):
+    """Uncached queries recently asked by other pages over the same rows."""
+    first = group[0]
+    if first.start_date is None or first.end_date != date.today():
+        return []
+    days = (first.end_date - first.start_date).days
+    found = []
+    for template, window in recent_queries():
+        if window != days:
+            continue
+        query = replace(template, start_date=first.start_date, end_date=first.end_date)
+        if query in group or query in found or fusion_key(query) != fusion_key(first) or _is_decomposable(query):
+            continue
+        if _cache.get(("result", query), data_version(conn, _sources(query))) is None:
+            found.append(query)
+            if len(found) == MAX_SIBLINGS:
+                break
+    return found
+
+
+def _split(frame, query, dimensions):
+    """The rows of one query in a fused result, as that query returns them."""
+    rows = frame[frame["GROUPING_ID"] == grouping_id(query, dimensions)] if dimensions else frame
+    # Per alias: two aliases of one logical dimension read the same column
+    measures = [name.upper() for name in query.base_measures()]
+    merged = rows[[fused_alias(name) for name in query.dimensions.values()] + measures]
+    merged = merged.set_axis(list(query.dimensions) + measures, axis=1)
+    return _finish(query, merged)
+
+
+def _run_group(conn, queries):
+    """Run a group from _group, fusing distinct queries into one GROUPING SETS scan."""
+    unique = list(dict.fromkeys(queries))
+    if len(unique) == 1:
+        frame = run_query(conn, unique[0])
+        return [frame] * len(queries)
+    siblings = _siblings(conn, unique)
+    fused = unique + siblings
+    query_plan = plan_fused(fused)
+    frame = execute(conn, query_plan.sql, list(query_plan.params) or None, name=f"{query_plan.source} (fused x{len(fused)})")
+    dimensions = fused_dimensions(fused)
+    results = {}
+    for query in fused:
+        try:
+            results[query] = _split(frame, query, dimensions)
+        except Exception:
+            # Fusion is an optimisation only; the others keep their share
+            results[query] = run_query(conn, query) if query in unique else None
+    # Other pages find their results already cached
+    for sibling in siblings:
+        if results[sibling] is not None:
+            _cache.put(("result", sibling), results[sibling], data_version(conn, _sources(sibling)))
+    return [results[query] for query in queries]
+
+
+_batcher = Batcher(_group, _run_group)
+
+
+def run_cached(conn, query, cache=None, remember=True):
+    """Execute a LogicalQuery, reusing cached month partitions where possible.
+
+    Queries that cannot be decomposed (distinct counts, top-N limits or no
+    date range) are cached as a whole result instead. remember=False keeps
+    the query from counting as used (the warmer replaying it, for instance).
+    """
+    cache = cache or _cache
+    if remember:
+        _remember(query)
+    version = data_version(conn, _sources(query))
+    pieces = partitions(query.start_date, query.end_date) if _is_decomposable(query) else []
+    if not pieces:
+        result = cache.get(("result", query), version)
+        note_cache("miss" if result is None else "hit")
+        if result is None:
+            result = _batcher.submit(conn, query)
+            cache.put(("result", query), result, version)
+        # Pages add columns to their results; keep the cached frame pristine
+        return result.copy()
+
+    shape = _shape_key(query)
+    frames, missing = {}, []
+    for piece in pieces:
+        frame = cache.get((shape, piece), version)
+        if frame is None:
+            missing.append(piece)
+        else:
+            frames[piece] = frame
+    note_cache("hit" if not missing else "miss" if not frames else "partial")
+
+    for span in _spans(missing):
+        for piece, frame in _fetch_partitions(conn, query, span).items():
+            cache.put((shape, piece), frame, version)
+            frames[piece] = frame
+
+    return _merge(query, [frames[piece] for piece in sorted(frames)])
@@ -0,0 +1,118 @@
+"""
+Refresh Monitor - How the MARTS Dynamic Tables actually refresh
+
+A Dynamic Table declared with REFRESH_MODE = INCREMENTAL can still spend most
+of its time in full refreshes (re-initialisation after a change upstream) or
+re-copying far more rows than changed. This module reads the configured mode
+from SHOW DYNAMIC TABLES and what each refresh really did from
+DYNAMIC_TABLE_REFRESH_HISTORY: its action (INCREMENTAL, FULL, REINITIALIZE or
+NO_DATA), how long it ran and how many rows it inserted, deleted and copied.
+Marts declared with REFRESH_MODE = AUTO (the *_CUSTOMER_SKETCH marts) report
+FULL with a refresh_mode_reason when Snowflake could not refresh them
+incrementally; those are flagged as fallbacks.
+
+Both sources need Snowflake and the MONITOR privilege on the tables; the local
+DuckDB warehouse has neither, and callers get the error to report.
+"""
+import pandas as pd
+
+from utils.instrumentation import execute
+
+DATABASE = "SALES_ANALYTICS_DB"
+
+# Refreshed in full on purpose: its preset dates depend on CURRENT_DATE()
+FULL_BY_DESIGN = {"KPI_SNAPSHOT"}
+
+REFRESH_ACTIONS = ("INCREMENTAL", "FULL", "REINITIALIZE", "NO_DATA")
+
+
+def table_settings(conn):
+    """Configured target lag, refresh mode (and why) and state of each mart."""
+    return execute(conn, f"""
+        SHOW DYNAMIC TABLES IN SCHEMA {DATABASE}.MARTS
+        ->> SELECT
+            "name" AS NAME,
+            "target_lag" AS TARGET_LAG,
+            "refresh_mode" AS REFRESH_MODE,
+            "refresh_mode_reason" AS REFRESH_MODE_REASON,
+            "scheduling_state" AS SCHEDULING_STATE
+        FROM $1
+    """, name="dynamic_tables")
+
+
+def refresh_history(conn, hours=24):
+    """One row per refresh of a mart in the last `hours` hours, newest first."""
+    return execute(conn, f"""
+        SELECT
+            NAME,
+            STATE,
+            REFRESH_ACTION,
+            REFRESH_TRIGGER,
+            REFRESH_START_TIME,
+            DATEDIFF('millisecond', REFRESH_START_TIME, REFRESH_END_TIME) AS DURATION_MS,
+            COALESCE(STATISTICS:numInsertedRows::NUMBER, 0) AS ROWS_INSERTED,
+            COALESCE(STATISTICS:numDeletedRows::NUMBER, 0) AS ROWS_DELETED,
+            COALESCE(STATISTICS:numCopiedRows::NUMBER, 0) AS ROWS_COPIED
+        FROM TABLE({DATABASE}.INFORMATION_SCHEMA.DYNAMIC_TABLE_REFRESH_HISTORY(
+            NAME_PREFIX => '{DATABASE}.MARTS.',
+            DATA_TIMESTAMP_START => DATEADD('hour', -{int(hours)}, CURRENT_TIMESTAMP()),
+            RESULT_LIMIT => 10000
+        ))
+        WHERE STATE IN ('SUCCEEDED', 'FAILED')
+        ORDER BY REFRESH_START_TIME DESC
+    """, name="refresh_history")
+
+
+def summarize(settings, history):
+    """Per-table refresh counts by action, durations and rows processed.
+
+    ROWS_PROCESSED counts rows inserted, deleted and copied, so a FULL refresh
+    shows the whole table while a good incremental one shows only the change.
+    FULL_REFRESHES counts full and re-initialising refreshes of tables that
+    should refresh incrementally.
+    """
+    history = history.assign(ROWS_PROCESSED=history.ROWS_INSERTED + history.ROWS_DELETED + history.ROWS_COPIED)
+    succeeded = history[history.STATE == "SUCCEEDED"]
+    actions = (
+        succeeded.pivot_table(index="NAME", columns="REFRESH_ACTION", values="STATE", aggfunc="count", fill_value=0)
+        .reindex(columns=list(REFRESH_ACTIONS), fill_value=0)
+    )
+    worked = succeeded[succeeded.REFRESH_ACTION != "NO_DATA"].groupby("NAME").agg(
+        AVG_DURATION_MS=("DURATION_MS", "mean"),
+        MAX_DURATION_MS=("DURATION_MS", "max"),
+        TOTAL_DURATION_MS=("DURATION_MS", "sum"),
+        AVG_ROWS_PROCESSED=("ROWS_PROCESSED", "mean"),
+    )
+    last = succeeded.groupby("NAME").REFRESH_ACTION.first().rename("LAST_ACTION")
+    failed = history[history.STATE == "FAILED"].groupby("NAME").size().rename("FAILED")
+
+    summary = settings.set_index("NAME").join([last, actions, failed, worked])
+    summary[[*REFRESH_ACTIONS, "FAILED"]] = summary[[*REFRESH_ACTIONS, "FAILED"]].fillna(0).astype(int)
+    summary["FULL_REFRESHES"] = (summary.FULL + summary.REINITIALIZE).where(
+        ~summary.index.isin(FULL_BY_DESIGN), 0
+    )
+    summary = summary.reset_index()
+    summary["FELL_BACK"] = fell_back(summary)
+    return summary.sort_values("TOTAL_DURATION_MS", ascending=False, na_position="last")
+
+
+def fell_back(settings):
+    """Whether each mart runs in FULL mode because incremental was not possible."""
+    reason = settings.REFRESH_MODE_REASON.fillna("").astype(str).str.strip()
+    full = settings.REFRESH_MODE.str.upper() == "FULL"
+    return full & (reason != "") & ~settings.NAME.isin(FULL_BY_DESIGN)
+
+
+def needs_attention(summary):
+    """Tables that fell back to or run in full refresh mode, or whose refreshes fail."""
+    expected = ~summary.NAME.isin(FULL_BY_DESIGN)
+    not_incremental = expected & (summary.REFRESH_MODE.str.upper() != "INCREMENTAL")
+    return summary[summary.FELL_BACK | not_incremental | (summary.FULL_REFRESHES > 0) | (summary.FAILED > 0)]
+
+
+def duration_trend(history):
+    """Refresh duration over time, one column per table (for charts)."""
+    if history.empty:
+        return pd.DataFrame()
+    worked = history[(history.STATE == "SUCCEEDED") & (history.REFRESH_ACTION != "NO_DATA")]
+    return worked.pivot_table(index="REFRESH_START_TIME", columns="NAME", values="DURATION_MS", aggfunc="max")
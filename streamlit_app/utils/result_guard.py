@@ -0,0 +1,158 @@
+"""
+Result Guard - Row caps, byte budgets and pagination for Cortex-generated SQL
+
+Generated SQL gets a LIMIT appended when it has none, and a trailing LIMIT
+or FETCH above the cap is lowered to it, so a question like "show me all
+orders" cannot pull the whole fact table. Results are then read from
+the open cursor one page at a time, as Arrow (see utils.arrow_results): the
+page shows a preview and fetches more pages on demand, and a per-answer byte
+budget stops fetching before a single answer can exhaust the app's memory.
+"""
+import re
+
+import pyarrow as pa
+
+from utils.arrow_results import arrow_batches, compact, to_frame
+
+# Hard cap on rows any generated query may return
+MAX_ROWS = 100_000
+
+# Rows shown when an answer first renders
+PREVIEW_ROWS = 500
+
+# Rows fetched per "Load more" click
+PAGE_ROWS = 5_000
+
+# Memory allowed for one answer's rows in the app process
+BYTE_BUDGET = 50 * 1024 * 1024
+
+_READ_QUERY = re.compile(r"^[\s(]*(SELECT|WITH)\b", re.IGNORECASE)
+# A trailing row-count clause: LIMIT n [OFFSET m], [OFFSET m] FETCH n ... or OFFSET m alone
+_TRAILING_ROWS = re.compile(
+    r"(?:\bLIMIT\s+(?P<limit>\d+)(?:\s+OFFSET\s+\d+(?:\s+ROWS?)?)?"
+    r"|\bFETCH\s+(?:(?:FIRST|NEXT)\s+)?(?P<fetch>\d+)(?:\s+ROWS?)?(?:\s+ONLY)?"
+    r"|\bOFFSET\s+(?P<offset>\d+)(?:\s+ROWS?)?)\s*$",
+    re.IGNORECASE,
+)
+
+
+def inject_limit(sql, max_rows=MAX_ROWS):
+    """Cap a read query at max_rows: append a LIMIT or lower its trailing one."""
+    sql = sql.strip().rstrip(";").strip()
+    if not _READ_QUERY.match(sql):
+        return sql
+    rows = _TRAILING_ROWS.search(sql)
+    if rows is None:
+        return f"{sql}\nLIMIT {int(max_rows)}"
+    if rows.group("offset") is not None:
+        # OFFSET without a row count reads every remaining row
+        return f"{sql[:rows.start()]}LIMIT {int(max_rows)} OFFSET {rows.group('offset')}"
+    count = "limit" if rows.group("limit") is not None else "fetch"
+    capped = min(int(rows.group(count)), int(max_rows))
+    return f"{sql[:rows.start(count)]}{capped}{sql[rows.end(count):]}"
+
+
+class ResultPager:
+    """Page through an executed cursor within a byte budget.
+
+    Rows are read as Arrow where the cursor supports it and accumulated in
+    table, which st.dataframe renders without a pandas copy. sql_column names
+    a column carrying the generated SQL (as returned by
+    SEMANTIC.ANSWER_QUESTION); it is split off into generated_sql.
+    """
+
+    def __init__(self, cursor, byte_budget=BYTE_BUDGET, sql_column=None):
+        self._cursor = cursor
+        self._batches = arrow_batches(cursor)
+        self._pending = None
+        self.byte_budget = byte_budget
+        self.sql_column = sql_column
+        self.generated_sql = None
+        self.columns = [column[0] for column in cursor.description]
+        self.table = pa.table({c: pa.nulls(0) for c in self.columns if c != sql_column})
+        self.bytes_used = 0
+        self.exhausted = False
+        self.truncated = False
+
+    @property
+    def has_more(self):
+        return not (self.exhausted or self.truncated)
+
+    @property
+    def frame(self):
+        """The rows fetched so far as a pandas DataFrame."""
+        return to_frame(self.table)
+
+    def _next_arrow(self, rows):
+        parts, count = [], 0
+        while count < rows:
+            if self._pending is None:
+                batch = next(self._batches, None)
+                if batch is None:
+                    break
+                self._pending = pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+            part = self._pending.slice(0, rows - count)
+            parts.append(part)
+            count += part.num_rows
+            self._pending = self._pending.slice(part.num_rows) if part.num_rows < self._pending.num_rows else None
+        return parts, count
+
+    def _next_rows(self, rows):
+        fetched = self._cursor.fetchmany(rows)
+        if not fetched:
+            return [], 0
+        columns = list(zip(*fetched))
+        return [pa.table({name: pa.array(values) for name, values in zip(self.columns, columns)})], len(fetched)
+
+    def fetch_page(self, rows=PAGE_ROWS):
+        """Fetch up to rows more rows; returns the number of rows added."""
+        if not self.has_more:
+            return 0
+        parts, count = self._next_arrow(rows) if self._batches is not None else self._next_rows(rows)
+        if count < rows:
+            self._finish(exhausted=True)
+        if not count:
+            return 0
+
+        page = compact(pa.concat_tables(parts, promote_options="default"))
+        if self.sql_column:
+            self.generated_sql = page.column(self.sql_column)[0].as_py()
+            page = page.drop_columns([self.sql_column])
+            if page.num_columns == 0:
+                # The procedure returns only the SQL when the query had no rows
+                return 0
+
+        page_bytes = page.nbytes
+        if self.bytes_used + page_bytes > self.byte_budget:
+            per_row = page_bytes / page.num_rows
+            keep = int((self.byte_budget - self.bytes_used) // per_row)
+            page = page.slice(0, keep)
+            page_bytes = page.nbytes
+            self._finish(truncated=True)
+
+        self.table = pa.concat_tables([self.table, page], promote_options="default")
+        self.bytes_used += page_bytes
+        return page.num_rows
+
+    def close(self):
+        """Stop paging and release the cursor; rows already fetched are kept."""
+        self._finish(exhausted=True)
+
+    def _finish(self, exhausted=False, truncated=False):
+        self.exhausted = self.exhausted or exhausted
+        self.truncated = self.truncated or truncated
+        self._batches = None
+        self._pending = None
+        if self._cursor is None:
+            return
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+        self._cursor = None
+
+    def __getstate__(self):
+        # Open cursors cannot be pickled; a restored pager just stops paging
+        state = self.__dict__.copy()
+        state.update(_cursor=None, _batches=None, _pending=None, exhausted=True)
+        return state
@@ -0,0 +1,164 @@
+"""
+Schema Prompt - Cortex prompts generated from sales_model.yaml
+
+The Ask Cortex page used to send a hand-written column listing with every
+question, which drifted from the semantic model (it had no REP_REGION and
+called ORDER_REGION "REGION"). The prompt is now generated from
+sales_model.yaml, the same file Cortex Analyst reads, and only describes the
+dimensions and measures a question refers to.
+
+The model is compiled once per process: each field gets its prompt line and a
+pattern for its name and every synonym. For a question, the longest phrases are
+matched first so "customer segment" selects CUSTOMER_SEGMENT rather than also
+CUSTOMER_NAME ("customer"). The order date and revenue are always described,
+matched fields follow in question order until PROMPT_TOKEN_BUDGET is spent,
+and the remaining columns are listed by name only so the model can still use
+them.
+
+Needs PyYAML (pip install pyyaml).
+"""
+import math
+import re
+from dataclasses import dataclass
+
+import streamlit as st
+
+from utils.translation_cache import SEMANTIC_MODEL_PATH
+
+try:
+    import yaml
+except ImportError:  # only needed for Ask Cortex
+    yaml = None
+
+# Rough budget for the column descriptions, in tokens (about 4 characters each)
+PROMPT_TOKEN_BUDGET = 250
+
+# Described for every question: date filters and the default measure
+ALWAYS_INCLUDED = ("order_date", "revenue")
+
+AGGREGATIONS = {
+    "sum": "SUM({expr})",
+    "avg": "AVG({expr})",
+    "count": "COUNT({expr})",
+    "count_distinct": "COUNT(DISTINCT {expr})",
+}
+
+PROMPT_TEMPLATE = """You are a SQL expert. Given this question about sales data, generate a Snowflake SQL query.
+
+The data is in {table} with columns:
+{columns}
+
+Return ONLY the SQL query, no explanation.
+
+Question: {question}"""
+
+
+def estimate_tokens(text):
+    """Approximate LLM token count of text."""
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class Field:
+    """A dimension or measure of the semantic model, ready to put in a prompt."""
+    name: str
+    expr: str
+    line: str
+    tokens: int
+    patterns: tuple             # (phrase length, compiled pattern)
+
+
+def _phrase_pattern(phrase):
+    # Words may be separated by any whitespace; the last may be plural or an adverb
+    words = re.findall(r"[\w%]+", phrase.lower())
+    body = r"\s+".join(re.escape(word) for word in words)
+    return re.compile(rf"(?<!\w){body}(?:s|es|ly)?(?!\w)")
+
+
+def _line(kind, column):
+    expr = column["expr"]
+    # The logical name is only worth its tokens when it differs from the column
+    named = f"{expr} ({column['name']})" if column["name"].upper() != expr else expr
+    text = f"- {named}: {column.get('description', '').rstrip('.')}"
+    if kind == "measure":
+        aggregation = AGGREGATIONS.get(column.get("default_aggregation"))
+        if aggregation:
+            text += f"; use {aggregation.format(expr=expr)}"
+    if column.get("sample_values"):
+        text += f"; values: {', '.join(str(value) for value in column['sample_values'])}"
+    return text
+
+
+def _field(kind, column):
+    phrases = {column["name"].replace("_", " "), *column.get("synonyms", ())}
+    line = _line(kind, column)
+    return Field(
+        name=column["name"],
+        expr=column["expr"],
+        line=line,
+        tokens=estimate_tokens(line) + 1,
+        patterns=tuple((len(phrase), _phrase_pattern(phrase)) for phrase in phrases),
+    )
+
+
+class SchemaPrompt:
+    """Compiled semantic model that builds a question-specific prompt."""
+
+    def __init__(self, model, budget=PROMPT_TOKEN_BUDGET):
+        table = model["tables"][0]
+        base = table["base_table"]
+        self.table = f"{base['database']}.{base['schema']}.{base['table']}"
+        self.budget = budget
+        self.fields = {}
+        for key, kind in (("dimensions", "dimension"), ("time_dimensions", "dimension"), ("measures", "measure")):
+            for column in table.get(key, ()):
+                self.fields[column["name"]] = _field(kind, column)
+        # Longest phrases claim their words first
+        self._patterns = sorted(
+            ((length, pattern, field) for field in self.fields.values() for length, pattern in field.patterns),
+            key=lambda entry: -entry[0],
+        )
+
+    @classmethod
+    def from_file(cls, path=SEMANTIC_MODEL_PATH, budget=PROMPT_TOKEN_BUDGET):
+        if yaml is None:
+            raise ImportError("Schema prompts need the PyYAML package (pip install pyyaml)")
+        with open(path) as model_file:
+            return cls(yaml.safe_load(model_file), budget)
+
+    def relevant(self, question):
+        """Fields the question mentions, in the order they appear in it."""
+        text = question.lower()
+        found = {}
+        for _, pattern, field in self._patterns:
+            for match in pattern.finditer(text):
+                found.setdefault(field.name, match.start())
+                # Blank the phrase out so shorter synonyms inside it do not match
+                text = text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+        return [self.fields[name] for name in sorted(found, key=found.get)]
+
+    def columns(self, question):
+        """Column section of the prompt for a question, within the token budget."""
+        chosen = [self.fields[name] for name in ALWAYS_INCLUDED if name in self.fields]
+        spent = sum(field.tokens for field in chosen)
+        for field in self.relevant(question):
+            if field in chosen or spent + field.tokens > self.budget:
+                continue
+            chosen.append(field)
+            spent += field.tokens
+        lines = [field.line for field in chosen]
+        described = {field.expr for field in chosen}
+        others = sorted({field.expr for field in self.fields.values()} - described)
+        if others:
+            lines.append(f"- Other columns: {', '.join(others)}")
+        return "\n".join(lines)
+
+    def render(self, question):
+        """The full prompt for a question."""
+        return PROMPT_TEMPLATE.format(table=self.table, columns=self.columns(question), question=question)
+
+
+@st.cache_resource(show_spinner=False)
+def get_schema_prompt():
+    """The compiled semantic model, parsed once per process."""
+    return SchemaPrompt.from_file()
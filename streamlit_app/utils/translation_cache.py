@@ -0,0 +1,134 @@
+"""
+Translation Cache - Persistent cache of Cortex NL-to-SQL translations
+
+Questions are normalized (case, punctuation, whitespace, filler words) and
+keyed together with a hash of the schema prompt and sales_model.yaml, so a
+schema change never serves SQL written for the old model. Entries live in a
+small SQLite file so they survive restarts, the least recently used ones are
+evicted beyond a size bound, and hit/miss counts are kept for the page.
+
+The file defaults to a cache directory private to the app's user (see
+cache_backends.private_cache_dir), since cached SQL is run as-is on a hit; set
+SALES_TRANSLATION_CACHE to a path (or SALES_CACHE_DIR to share a directory) to
+move it.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import streamlit as st
+
+from utils.cache_backends import private_cache_dir
+
+SEMANTIC_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "sales_model.yaml")
+
+MAX_ENTRIES = 5000
+
+FILLER_WORDS = {"please", "can", "could", "you", "me", "tell", "show", "give", "the", "a", "an"}
+
+
+def normalize_question(question):
+    """Reduce a question to a canonical form for cache lookups."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = re.sub(r"[^\w\s%$.-]", " ", text)
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    words = [word for word in text.split() if word not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def schema_hash(prompt_template, model_path=SEMANTIC_MODEL_PATH):
+    """Hash of everything that shapes the generated SQL besides the question."""
+    digest = hashlib.sha256(prompt_template.encode())
+    try:
+        with open(model_path, "rb") as model_file:
+            digest.update(model_file.read())
+    except FileNotFoundError:
+        pass
+    return digest.hexdigest()[:16]
+
+
+def _default_path():
+    if os.environ.get("SALES_TRANSLATION_CACHE"):
+        return os.environ["SALES_TRANSLATION_CACHE"]
+    return os.path.join(private_cache_dir(), "sales_analytics_translations.sqlite3")
+
+
+class TranslationCache:
+    """SQLite-backed LRU cache of generated SQL keyed by normalized question."""
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path or _default_path()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                question TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                sql_text TEXT NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (question, schema_hash)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, question, schema):
+        """Return cached SQL for the question, or None on a miss."""
+        key = normalize_question(question)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sql_text FROM translations WHERE question = ? AND schema_hash = ?",
+                (key, schema),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE translations SET hit_count = hit_count + 1, last_used = ? "
+                "WHERE question = ? AND schema_hash = ?",
+                (time.time(), key, schema),
+            )
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, question, schema, sql_text):
+        """Store SQL for the question and evict the oldest entries if full."""
+        key = normalize_question(question)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (question, schema_hash, sql_text, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, schema, sql_text, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                "SELECT rowid FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def stats(self):
+        """Hit/miss counts for this process plus the number of stored entries."""
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+@st.cache_resource
+def get_translation_cache():
+    """Process-wide translation cache shared by all sessions."""
+    return TranslationCache()
@@ -0,0 +1,217 @@
+"""
+Warmer - Resume the warehouse and pre-fill the result cache in the background
+
+SALES_ANALYTICS_WH auto-suspends after two idle minutes, so the first visitor
+after a quiet spell waits for the warehouse to resume and then for every page
+query to run cold. A background thread started with the connection does that
+work ahead of them: it resumes the warehouse and replays the rolling-window
+page queries recorded by utils.range_cache (the default 1-year window unless
+configured otherwise) through the result cache.
+
+The registry starts with every page's on-load queries (utils.page_queries),
+so a fresh deployment is warmed before anyone has visited a page. KPIs for a
+window that is a sidebar preset are left out: the dashboard reads those from
+KPI_SNAPSHOT (utils.kpi_snapshot) and never runs the query. A full
+warm-up runs at start-up and at the times of day listed in SALES_WARM_AT.
+When a Dynamic Table refresh brings new data (seen through utils.freshness),
+only queries used within SALES_WARM_ACTIVE_HOURS are replayed, and nothing at
+all when nobody has used the app lately, so an idle warehouse can suspend.
+
+The registry is saved as JSON in the app's private cache directory (see
+utils.cache_backends.private_cache_dir) so a restarted app keeps what users
+asked for.
+
+Settings (environment variables):
+    SALES_WARM               "off" disables the warmer
+    SALES_WARM_AT            comma-separated local times, default "07:00"
+    SALES_WARM_WINDOWS       window lengths in days to replay, default "365"
+    SALES_WARM_POLL          seconds between refresh checks, default 60
+    SALES_WARM_ACTIVE_HOURS  recent use needed for refresh warm-ups, default 1
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import fields, replace
+from datetime import date, datetime, timedelta
+
+from utils.cache_backends import private_cache_dir
+from utils.freshness import refresh_state
+from utils.kpi_snapshot import match_preset
+from utils.page_queries import DEFAULT_QUERIES, kpis
+from utils.query_router import LogicalQuery
+from utils.range_cache import recent_queries, recent_usage, remember_all, run_cached
+
+WAREHOUSE = "SALES_ANALYTICS_WH"
+
+DEFAULT_TIMES = "07:00"
+DEFAULT_WINDOWS = "365"
+DEFAULT_POLL_SECONDS = 60
+DEFAULT_ACTIVE_HOURS = 1
+
+logger = logging.getLogger("sales_analytics.warmer")
+
+
+def _settings():
+    times = [
+        datetime.strptime(value.strip(), "%H:%M").time()
+        for value in os.environ.get("SALES_WARM_AT", DEFAULT_TIMES).split(",")
+        if value.strip()
+    ]
+    windows = {int(value) for value in os.environ.get("SALES_WARM_WINDOWS", DEFAULT_WINDOWS).split(",") if value.strip()}
+    poll = int(os.environ.get("SALES_WARM_POLL", DEFAULT_POLL_SECONDS))
+    active_hours = float(os.environ.get("SALES_WARM_ACTIVE_HOURS", DEFAULT_ACTIVE_HOURS))
+    return times, windows, poll, active_hours
+
+
+def _registry_path():
+    return os.path.join(private_cache_dir(), "sales_analytics_warm_queries.json")
+
+
+def _encode(template, days, used_at):
+    query = {f.name: getattr(template, f.name) for f in fields(LogicalQuery)}
+    return {"query": query, "days": days, "used_at": used_at}
+
+
+def _decode(entry):
+    query = dict(entry["query"])
+    # JSON has no tuples; filter value lists and cursors were tuples
+    query["filters"] = {
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in query["filters"].items()
+    }
+    if query["after"] is not None:
+        query["after"] = tuple(query["after"])
+    return LogicalQuery(**query), int(entry["days"]), float(entry["used_at"])
+
+
+def _served_by_snapshot(template, days, today=None):
+    """True for the KPI query over a preset window, answered from KPI_SNAPSHOT."""
+    today = today or date.today()
+    return template == kpis(None, None) and match_preset(today - timedelta(days=days), today) is not None
+
+
+def seed_registry(windows=None):
+    """Register every page's on-load queries, as never used, for each window."""
+    if windows is None:
+        windows = _settings()[1]
+    remember_all(
+        (builder(None, None), days, 0.0)
+        for builder in DEFAULT_QUERIES
+        for days in windows
+        if not _served_by_snapshot(builder(None, None), days)
+    )
+
+
+def load_registry(path=None):
+    """Load the recorded page queries saved by a previous run."""
+    try:
+        with open(path or _registry_path()) as registry:
+            entries = [_decode(entry) for entry in json.load(registry)]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing or written by an incompatible version; pages re-record it
+        return
+    remember_all(entries)
+
+
+def save_registry(path=None):
+    """Persist the recorded page queries for the next start-up."""
+    path = path or _registry_path()
+    try:
+        with open(f"{path}.tmp", "w") as registry:
+            json.dump([_encode(*entry) for entry in recent_usage()], registry)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, TypeError, ValueError):
+        logger.warning("Could not save warm query registry to %s", path)
+
+
+def resume_warehouse(conn):
+    """Resume the warehouse if it is suspended; a no-op off Snowflake."""
+    if not (hasattr(conn, "raw_connection") or hasattr(conn, "checkout")):
+        return
+    try:
+        conn.query(f"ALTER WAREHOUSE {WAREHOUSE} RESUME IF SUSPENDED", ttl=0, show_spinner=False)
+    except Exception as error:
+        # Needs OPERATE on the warehouse; the first query resumes it anyway
+        logger.info("Warehouse resume skipped: %s", error)
+
+
+def warm(conn, windows=None, since=None):
+    """Resume the warehouse and run the recorded queries; return how many ran.
+
+    With since (a time.time() value) only queries used since then are run,
+    and the warehouse is left alone if there are none.
+    """
+    if windows is None:
+        windows = _settings()[1]
+    templates = [
+        (template, days) for template, days in recent_queries(since)
+        if days in windows and not _served_by_snapshot(template, days)
+    ]
+    if not templates:
+        return 0
+    resume_warehouse(conn)
+    today = date.today()
+    count = 0
+    for template, days in templates:
+        query = replace(template, start_date=today - timedelta(days=days), end_date=today)
+        try:
+            run_cached(conn, query, remember=False)
+            count += 1
+        except Exception as error:
+            logger.warning("Warm-up query failed: %s", error)
+    save_registry()
+    return count
+
+
+class Warmer(threading.Thread):
+    """Daemon thread that keeps the result cache warm."""
+
+    def __init__(self, conn):
+        super().__init__(name="cache-warmer", daemon=True)
+        self.conn = conn
+        self.times, self.windows, self.poll, self.active_hours = _settings()
+        self.last_warm = None
+
+    def _due(self, now, state, last_state):
+        if self.last_warm is None:
+            return "start-up"
+        if state is not None and state != last_state:
+            return "refresh"
+        for at in self.times:
+            scheduled = datetime.combine(now.date(), at)
+            if self.last_warm < scheduled <= now:
+                return "schedule"
+        return None
+
+    def run(self):
+        seed_registry(self.windows)
+        load_registry()
+        last_state = None
+        while True:
+            try:
+                state = refresh_state(self.conn)
+                now = datetime.now()
+                reason = self._due(now, state, last_state)
+                if reason:
+                    started = time.perf_counter()
+                    # Refreshes come every few minutes; only keep warm what is in use
+                    since = time.time() - self.active_hours * 3600 if reason == "refresh" else None
+                    count = warm(self.conn, self.windows, since)
+                    logger.info("Warmed %d queries (%s) in %.1fs", count, reason, time.perf_counter() - started)
+                    self.last_warm = now
+                last_state = state
+            except Exception as error:
+                logger.warning("Warm-up failed: %s", error)
+                self.last_warm = self.last_warm or datetime.now()
+            time.sleep(self.poll)
+
+
+def start_warmer(conn):
+    """Start the background warmer unless SALES_WARM is "off"; return it or None."""
+    if os.environ.get("SALES_WARM", "").lower() in ("off", "0", "false"):
+        return None
+    warmer = Warmer(conn)
+    warmer.start()
+    return warmer
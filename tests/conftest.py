@@ -0,0 +1,64 @@
+"""
+Shared fixtures: a small local DuckDB warehouse and an empty result cache
+
+fact() and assert_same() compare app results with direct FCT_ORDERS SQL.
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "streamlit_app")
+sys.path.insert(0, APP_DIR)
+
+# Results are cached in memory only, so runs cannot see each other's files
+os.environ.pop("SALES_CACHE_DIR", None)
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from utils.local_warehouse import LocalConnection  # noqa: E402
+from utils.range_cache import get_range_cache  # noqa: E402
+
+ORDERS = 20_000
+
+FACT = "SALES_ANALYTICS_DB.MARTS.FCT_ORDERS"
+
+
+def fact(conn, sql, start_date, end_date, params=()):
+    """Run SQL over FCT_ORDERS rows between the two dates ({fact} is the table)."""
+    return conn.query(
+        sql.format(fact=FACT, where="ORDER_DATE BETWEEN ? AND ?"),
+        params=[start_date, end_date, *params],
+    )
+
+
+def ragged_range(today=None):
+    """About six months starting and ending mid-month, ended before today."""
+    today = today or date.today()
+    end_date = (today.replace(day=1) - timedelta(days=1)).replace(day=13)
+    start_date = (end_date - timedelta(days=180)).replace(day=20)
+    return start_date, end_date
+
+
+def assert_same(actual, expected):
+    """Frames equal on expected's columns, in row order, up to float rounding."""
+    pd.testing.assert_frame_equal(
+        actual[list(expected.columns)].reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+@pytest.fixture(scope="session")
+def conn():
+    """Local warehouse seeded with ORDERS orders ending today."""
+    pytest.importorskip("duckdb")
+    return LocalConnection(orders=ORDERS)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_range_cache().clear()
+    yield
+    get_range_cache().clear()
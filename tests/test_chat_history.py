@@ -0,0 +1,31 @@
+"""
+Spilled Ask Cortex results
+"""
+import os
+
+import pyarrow as pa
+import pytest
+
+from utils.chat_history import PREVIEW_ROWS, spill
+
+
+def open_files():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_load_closes_the_spill_file(tmp_path):
+    result = spill(pa.table({"A": list(range(1000))}), str(tmp_path))
+    before = open_files()
+    tables = [result.load() for _ in range(20)]
+    assert open_files() == before
+
+    # Loaded tables stay readable after the file is gone
+    result.discard()
+    assert all(table.column("A")[-1].as_py() == 999 for table in tables)
+
+
+def test_load_after_discard_returns_the_preview(tmp_path):
+    result = spill(pa.table({"A": list(range(1000))}), str(tmp_path))
+    result.discard()
+    assert len(result.load()) == PREVIEW_ROWS
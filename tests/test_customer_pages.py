@@ -0,0 +1,61 @@
+"""
+Customer listings against direct FCT_ORDERS aggregates
+"""
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from conftest import assert_same, fact, ragged_range
+from utils import page_queries, range_cache
+from utils.query_router import plan, run_query
+
+
+@pytest.fixture
+def year():
+    today = date.today()
+    return today - timedelta(days=365), today
+
+
+def test_dated_ranking_reads_the_monthly_rollup(conn):
+    start_date, end_date = ragged_range()
+    query = page_queries.customer_page(start_date, end_date, page_size=20)
+    expected = fact(conn, """
+        SELECT CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT AS SEGMENT,
+               SUM(NET_AMOUNT) AS TOTAL_REVENUE, COUNT(*) AS ORDER_COUNT,
+               MIN(ORDER_DATE) AS FIRST_ORDER_DATE, MAX(ORDER_DATE) AS LAST_ORDER_DATE
+        FROM {fact} WHERE {where}
+        GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT
+        ORDER BY TOTAL_REVENUE DESC, CUSTOMER_ID DESC
+        LIMIT 21
+    """, start_date, end_date)
+
+    # Whole months from the customer rollup, only the edges from FCT_ORDERS
+    assert plan(query).source == "SALES_BY_CUSTOMER_MONTH"
+    assert_same(run_query(conn, query), expected)
+
+
+def test_keyset_pages_walk_the_ranking(conn, year):
+    start_date, end_date = year
+    page_size = 5
+    expected = fact(conn, """
+        SELECT CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT AS SEGMENT,
+               SUM(NET_AMOUNT) AS TOTAL_REVENUE, COUNT(*) AS ORDER_COUNT
+        FROM {fact} WHERE {where} AND CUSTOMER_SEGMENT = ?
+        GROUP BY CUSTOMER_ID, CUSTOMER_NAME, CUSTOMER_SEGMENT
+        ORDER BY TOTAL_REVENUE DESC, CUSTOMER_ID DESC
+        LIMIT ?
+    """, start_date, end_date, ("SMB", 2 * page_size))
+
+    first = range_cache.run_cached(conn, page_queries.customer_page(start_date, end_date, "SMB", page_size=page_size))
+    # One extra row tells the page there is a next page
+    assert len(first) == page_size + 1
+    first = first.head(page_size)
+    last = first.iloc[-1]
+    # As the Customer Insights page builds its cursor
+    after = (last["TOTAL_REVENUE"].item(), last["CUSTOMER_ID"].item())
+    second = range_cache.run_cached(
+        conn, page_queries.customer_page(start_date, end_date, "SMB", after=after, page_size=page_size)
+    ).head(page_size)
+
+    assert_same(pd.concat([first, second]), expected)
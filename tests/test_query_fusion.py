@@ -0,0 +1,129 @@
+"""
+Fused GROUPING SETS queries against separate queries and direct FCT_ORDERS aggregates
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import APP_DIR, ORDERS, assert_same, fact
+from utils import page_queries, range_cache
+from utils.batch_loader import load_all
+from utils.query_router import LogicalQuery, run_query
+
+
+@pytest.fixture
+def year():
+    today = date.today()
+    return today - timedelta(days=365), today
+
+
+def load_concurrently(conn, queries):
+    """Run queries through the range cache at once, as a page's loaders do."""
+    return load_all({
+        index: (range_cache.run_cached, conn, query) for index, query in enumerate(queries)
+    })
+
+
+def test_fused_group_matches_separate_queries(conn, year):
+    start_date, end_date = year
+    by_segment = LogicalQuery(
+        measures={"CUSTOMER_COUNT": "customer_count", "TOTAL_REVENUE": "revenue"},
+        dimensions={"SEGMENT": "customer_segment"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="SEGMENT",
+    )
+    by_industry = LogicalQuery(
+        measures={"CUSTOMER_COUNT": "customer_count", "AVG_ORDER_VALUE": "avg_order_value"},
+        dimensions={"INDUSTRY": "industry"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="INDUSTRY",
+    )
+    totals = LogicalQuery(
+        measures={"CUSTOMER_COUNT": "customer_count", "ORDER_COUNT": "order_count"},
+        start_date=start_date,
+        end_date=end_date,
+    )
+    queries = [by_segment, by_industry, totals]
+    assert range_cache._group(queries) == [[0, 1, 2]]
+
+    segment, industry, total = range_cache._run_group(conn, queries)
+    assert_same(segment, fact(conn, """
+        SELECT CUSTOMER_SEGMENT AS SEGMENT, COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT,
+               SUM(NET_AMOUNT) AS TOTAL_REVENUE
+        FROM {fact} WHERE {where}
+        GROUP BY CUSTOMER_SEGMENT ORDER BY SEGMENT
+    """, start_date, end_date))
+    assert_same(industry, fact(conn, """
+        SELECT INDUSTRY, COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT,
+               AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
+        FROM {fact} WHERE {where}
+        GROUP BY INDUSTRY ORDER BY INDUSTRY
+    """, start_date, end_date))
+    assert_same(total, fact(conn, """
+        SELECT COUNT(DISTINCT CUSTOMER_ID) AS CUSTOMER_COUNT, COUNT(*) AS ORDER_COUNT
+        FROM {fact} WHERE {where}
+    """, start_date, end_date))
+
+
+def test_month_dimension_fuses_with_partitioned_queries(conn):
+    # category_trend already groups by month, the partition key of the others
+    today = date.today()
+    start_date, end_date = today - timedelta(days=30), today
+    queries = [
+        page_queries.category_summary(start_date, end_date),
+        page_queries.category_trend(start_date, end_date),
+    ]
+    results = load_concurrently(conn, queries)
+    for index, query in enumerate(queries):
+        assert_same(results[index], run_query(conn, query))
+
+
+def test_sub_month_range_loads_every_default_query(conn):
+    # Five days inside last month: no whole month, only a ragged edge
+    start_date = (date.today().replace(day=1) - timedelta(days=1)).replace(day=5)
+    end_date = start_date + timedelta(days=4)
+    queries = [builder(start_date, end_date) for builder in page_queries.DEFAULT_QUERIES]
+    results = load_concurrently(conn, queries)
+    for index, query in enumerate(queries):
+        assert_same(results[index], run_query(conn, query))
+
+
+def test_member_that_fails_to_split_runs_alone(conn, year, monkeypatch):
+    start_date, end_date = year
+    queries = [
+        page_queries.segment_summary(start_date, end_date),
+        page_queries.kpis(start_date, end_date),
+    ]
+    assert range_cache._group(queries) == [[0, 1]]
+
+    split = range_cache._split
+
+    def failing_split(frame, query, dimensions):
+        if query is queries[0]:
+            raise KeyError("SEGMENT")
+        return split(frame, query, dimensions)
+
+    monkeypatch.setattr(range_cache, "_split", failing_split)
+    segment, kpis = range_cache._run_group(conn, queries)
+    assert_same(segment, run_query(conn, queries[0]))
+    assert_same(kpis, run_query(conn, queries[1]))
+
+
+def test_product_analysis_loads_30d_on_a_cold_cache(monkeypatch):
+    pytest.importorskip("duckdb")
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setenv("SALES_WAREHOUSE", "local")
+    monkeypatch.setenv("SALES_WARM", "off")
+    monkeypatch.setenv("SALES_LOCAL_ORDERS", str(ORDERS))
+    app = AppTest.from_file(os.path.join(APP_DIR, "streamlit_app.py"), default_timeout=120)
+    app.run()
+    next(button for button in app.sidebar.button if button.label == "30D").click().run()
+    range_cache.get_range_cache().clear()
+
+    app.switch_page("app_pages/product_analysis.py").run()
+    assert not app.exception
+    assert not [error.value for error in app.error]
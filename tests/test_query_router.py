@@ -0,0 +1,51 @@
+"""
+Query router plans against direct FCT_ORDERS aggregates
+"""
+from datetime import date, timedelta
+
+from conftest import assert_same, fact, ragged_range
+from utils.query_router import LogicalQuery, plan, run_query
+
+
+def by_region(start_date, end_date):
+    return LogicalQuery(
+        measures={
+            "TOTAL_REVENUE": "revenue",
+            "ORDER_COUNT": "order_count",
+            "AVG_ORDER_VALUE": "avg_order_value",
+        },
+        dimensions={"REGION": "region"},
+        start_date=start_date,
+        end_date=end_date,
+        order_by="REGION",
+    )
+
+
+def expected_by_region(conn, start_date, end_date):
+    return fact(conn, """
+        SELECT ORDER_REGION AS REGION, SUM(NET_AMOUNT) AS TOTAL_REVENUE,
+               COUNT(*) AS ORDER_COUNT, AVG(NET_AMOUNT) AS AVG_ORDER_VALUE
+        FROM {fact} WHERE {where}
+        GROUP BY ORDER_REGION ORDER BY REGION
+    """, start_date, end_date)
+
+
+def test_ragged_range_matches_fact_table(conn):
+    start_date, end_date = ragged_range()
+    query = by_region(start_date, end_date)
+
+    # Month rollup for the covered months, fact-table edges for the rest
+    query_plan = plan(query)
+    assert query_plan.source == "SALES_BY_REGION"
+    assert "FCT_ORDERS" in query_plan.sources
+    assert_same(run_query(conn, query), expected_by_region(conn, start_date, end_date))
+
+
+def test_sub_month_range_reads_the_fact_table(conn):
+    start_date = (date.today().replace(day=1) - timedelta(days=1)).replace(day=5)
+    end_date = start_date + timedelta(days=4)
+    query = by_region(start_date, end_date)
+
+    # No whole month to take from the rollup
+    assert plan(query).sources == ("FCT_ORDERS",)
+    assert_same(run_query(conn, query), expected_by_region(conn, start_date, end_date))
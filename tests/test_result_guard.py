@@ -0,0 +1,33 @@
+"""
+Row caps for generated SQL
+"""
+import pytest
+
+from conftest import FACT
+from utils.result_guard import inject_limit
+
+
+@pytest.mark.parametrize("sql, capped", [
+    ("SELECT * FROM t", "SELECT * FROM t\nLIMIT 1000"),
+    ("SELECT * FROM t LIMIT 10;", "SELECT * FROM t LIMIT 10"),
+    ("SELECT * FROM t LIMIT 5000000 OFFSET 20", "SELECT * FROM t LIMIT 1000 OFFSET 20"),
+    ("SELECT * FROM t ORDER BY a FETCH FIRST 5000000 ROWS ONLY", "SELECT * FROM t ORDER BY a FETCH FIRST 1000 ROWS ONLY"),
+    ("SELECT * FROM t FETCH NEXT 10 ROWS ONLY", "SELECT * FROM t FETCH NEXT 10 ROWS ONLY"),
+    ("SELECT * FROM t OFFSET 20 ROWS FETCH FIRST 5000000 ROWS ONLY", "SELECT * FROM t OFFSET 20 ROWS FETCH FIRST 1000 ROWS ONLY"),
+    ("SELECT * FROM t ORDER BY a OFFSET 20", "SELECT * FROM t ORDER BY a LIMIT 1000 OFFSET 20"),
+    ("(SELECT a FROM t) UNION (SELECT a FROM u)", "(SELECT a FROM t) UNION (SELECT a FROM u)\nLIMIT 1000"),
+    ("DELETE FROM t", "DELETE FROM t"),
+])
+def test_inject_limit(sql, capped):
+    assert inject_limit(sql, max_rows=1000) == capped
+
+
+@pytest.mark.parametrize("sql", [
+    "(SELECT ORDER_ID FROM {fact}) UNION ALL (SELECT ORDER_ID FROM {fact})",
+    "SELECT ORDER_ID FROM {fact} ORDER BY ORDER_ID OFFSET 5",
+    "SELECT ORDER_ID FROM {fact} LIMIT 5000000 OFFSET 5",
+    "SELECT ORDER_ID FROM {fact} ORDER BY ORDER_ID FETCH FIRST 5000000 ROWS ONLY",
+])
+def test_capped_sql_runs(conn, sql):
+    result = conn.query(inject_limit(sql.format(fact=FACT), max_rows=10))
+    assert len(result) == 10
@@ -0,0 +1,36 @@
+"""
+Top products per category against direct FCT_ORDERS aggregates
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import assert_same, fact
+from utils import page_queries, range_cache
+
+
+@pytest.fixture
+def year():
+    today = date.today()
+    return today - timedelta(days=365), today
+
+
+def test_top_per_category_matches_fact_table(conn, year):
+    start_date, end_date = year
+    categories = ("CLOTHING", "TOYS")
+    query = page_queries.top_products(start_date, end_date, categories, per_category=3)
+
+    products = fact(conn, """
+        SELECT PRODUCT_NAME, CATEGORY, SUM(NET_AMOUNT) AS TOTAL_REVENUE,
+               COUNT(*) AS TOTAL_ORDERS, SUM(QUANTITY) AS TOTAL_UNITS
+        FROM {fact} WHERE {where} AND CATEGORY IN (?, ?)
+        GROUP BY PRODUCT_NAME, CATEGORY
+    """, start_date, end_date, categories)
+    expected = (
+        products.sort_values(["CATEGORY", "TOTAL_REVENUE"], ascending=[True, False])
+        .groupby("CATEGORY").head(3)
+    )
+
+    result = range_cache.run_cached(conn, query)
+    assert list(result["CATEGORY"].value_counts().sort_index()) == [3, 3]
+    assert_same(result, expected)
@@ -0,0 +1,31 @@
+"""
+Warm-up registry and replay
+"""
+import pytest
+
+from utils import range_cache, warmer
+from utils.page_queries import daily_trend, kpis
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(range_cache, "_recent", {})
+    monkeypatch.setattr(warmer, "save_registry", lambda path=None: None)
+
+
+def test_seed_leaves_out_kpis_of_preset_windows():
+    warmer.seed_registry({365, 200})
+    seeded = range_cache.recent_queries()
+    # 365 days is the 1Y preset, served from KPI_SNAPSHOT
+    assert (kpis(None, None), 365) not in seeded
+    assert (kpis(None, None), 200) in seeded
+    assert (daily_trend(None, None), 365) in seeded
+
+
+def test_warm_skips_kpis_of_preset_windows(conn):
+    range_cache.remember_all([
+        (kpis(None, None), 365, 1.0),
+        (kpis(None, None), 200, 1.0),
+        (daily_trend(None, None), 365, 1.0),
+    ])
+    assert warmer.warm(conn, windows={365, 200}) == 2